@@ -0,0 +1,4 @@
+"""
+Performance benchmarks for Habit Tracker.
+Run individual modules with ``python -m benchmarks.<name>``.
+"""
@@ -0,0 +1,64 @@
+"""
+Analytics benchmarks - pure-Python versus NumPy analyze_performance.
+
+Usage:
+    python -m benchmarks.bench_analytics [habits] [completions_per_habit]
+"""
+
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+from src.analytics import analyze_performance
+from src.columnar import HAS_NUMPY
+from src.habit import Habit
+
+
+def make_habits(habit_count: int, completions: int, seed: int = 7) -> List[Habit]:
+    """
+    Create habits with random recent completion histories.
+    
+    Args:
+        habit_count: Number of habits
+        completions: Completions per habit
+        seed: Random seed for reproducible data
+        
+    Returns:
+        List[Habit]: Generated habits
+    """
+    rng = random.Random(seed)
+    now = datetime(2024, 6, 30, 12)
+    habits = []
+    for i in range(habit_count):
+        habit = Habit(f"Habit {i}", "daily" if i % 3 else "weekly")
+        habit.completions = [now - timedelta(days=rng.randint(0, 2 * completions)) for _ in range(completions)]
+        habits.append(habit)
+    return habits
+
+
+def timed(func, *args, **kwargs) -> float:
+    """Return the wall-clock seconds taken by func(*args, **kwargs)."""
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    return time.perf_counter() - start
+
+
+def main(habit_count: int, completions: int):
+    """Compare both analyze_performance backends on the same data."""
+    as_of = datetime(2024, 6, 30, 12)
+    print(f"{habit_count} habits x {completions} completions")
+    
+    # Fresh objects per run so neither backend benefits from cached runs
+    python = timed(analyze_performance, make_habits(habit_count, completions), as_of)
+    print(f"  python: {python:.3f}s")
+    if HAS_NUMPY:
+        vectorized = timed(analyze_performance, make_habits(habit_count, completions), as_of, backend="numpy")
+        print(f"  numpy:  {vectorized:.3f}s ({python / vectorized:.1f}x)")
+    else:
+        print("  numpy:  not installed")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*(args + [20_000, 100][len(args):]))
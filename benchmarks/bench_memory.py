@@ -0,0 +1,65 @@
+"""
+Memory benchmark - Habit versus CompactHabit for large fleets.
+
+Usage:
+    python -m benchmarks.bench_memory [habits] [completions_per_habit]
+"""
+
+import sys
+import tracemalloc
+from datetime import datetime, timedelta
+from src.habit import CompactHabit, Habit
+
+
+def build(habit_class: type, habit_count: int, completions: int) -> list:
+    """
+    Create habits with an alternate-day completion history.
+    
+    Every completion starts a new run (the worst case for streak caches),
+    and each habit's streak is queried once so cached state is measured.
+    
+    Args:
+        habit_class: Habit or CompactHabit
+        habit_count: Number of habits
+        completions: Completions per habit
+        
+    Returns:
+        list: Created habits
+    """
+    start = datetime(2020, 1, 1, 7, 30)
+    days = [start + timedelta(days=2 * d) for d in range(completions)]
+    habits = []
+    for i in range(habit_count):
+        habit = habit_class(f"Habit {i}", "daily")
+        for moment in days:
+            # Fresh datetime objects, as loading from storage would produce
+            habit.complete(moment.replace(second=i % 60))
+        habit.get_streak()
+        habit.mark_saved()
+        habits.append(habit)
+    return habits
+
+
+def measure(habit_class: type, habit_count: int, completions: int) -> int:
+    """Return the bytes still allocated after building the habits."""
+    tracemalloc.start()
+    habits = build(habit_class, habit_count, completions)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del habits
+    return current
+
+
+def main(habit_count: int, completions: int):
+    """Print memory used by both representations."""
+    print(f"{habit_count} habits x {completions} completions")
+    regular = measure(Habit, habit_count, completions)
+    compact = measure(CompactHabit, habit_count, completions)
+    print(f"  Habit:        {regular / 1e6:8.1f} MB ({regular / habit_count:,.0f} B/habit)")
+    print(f"  CompactHabit: {compact / 1e6:8.1f} MB ({compact / habit_count:,.0f} B/habit)")
+    print(f"  ratio:        {regular / compact:8.1f}x")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*(args + [10_000, 365][len(args):]))
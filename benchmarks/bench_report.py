@@ -0,0 +1,59 @@
+"""
+Report benchmarks - per-habit rows of the analytics command.
+
+Compares the linear row builder against the legacy loop that looked up
+every habit by name in the full list. The legacy loop is quadratic, so it
+is only run up to LEGACY_LIMIT habits.
+
+Usage:
+    python -m benchmarks.bench_report [sizes...]
+"""
+
+import sys
+from datetime import datetime
+from typing import List
+from benchmarks.bench_analytics import make_habits, timed
+from src.analytics import aggregate_stats, collect_habit_stats, get_longest_streak_for_habit
+from src.habit import Habit
+
+LEGACY_LIMIT = 10_000
+
+
+def legacy_rows(habits: List[Habit], as_of: datetime) -> List[tuple]:
+    """
+    Reference O(n^2) report rows: a name lookup over all habits per habit.
+    
+    Args:
+        habits: Habits to report
+        as_of: Reference time
+        
+    Returns:
+        List[tuple]: (name, current streak, longest streak) per habit
+    """
+    return [(habit.name, habit.get_streak(as_of), get_longest_streak_for_habit(habits, habit.name, as_of))
+            for habit in habits]
+
+
+def linear_report(habits: List[Habit], as_of: datetime):
+    """Build the rows and the summary totals the way the CLI does."""
+    aggregate_stats(collect_habit_stats(habits, as_of))
+
+
+def main(sizes: List[int]):
+    """Time both report builders and print the cost per habit."""
+    as_of = datetime(2024, 6, 30, 12)
+    print(f"{'habits':>8} {'linear':>10} {'us/habit':>9} {'legacy':>10} {'us/habit':>9}")
+    for size in sizes:
+        habits = make_habits(size, 5)
+        # Warm the streak caches so only the report loop itself is timed
+        linear_report(habits, as_of)
+        linear = timed(linear_report, habits, as_of)
+        line = f"{size:>8} {linear:>9.3f}s {linear / size * 1e6:>9.2f}"
+        if size <= LEGACY_LIMIT:
+            legacy = timed(legacy_rows, habits, as_of)
+            line += f" {legacy:>9.3f}s {legacy / size * 1e6:>9.2f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000])
@@ -0,0 +1,78 @@
+"""
+Storage benchmarks - bulk loading versus the per-habit query loop.
+
+Usage:
+    python -m benchmarks.bench_storage [sizes...]
+"""
+
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import List
+from src.habit import Habit, from_epoch_seconds
+from src.storage import HabitDatabase
+
+
+def populate(db: HabitDatabase, habit_count: int, completions_per_habit: int = 5):
+    """
+    Fill a database with synthetic habits and completions.
+    
+    Args:
+        db: Target database
+        habit_count: Number of habits to create
+        completions_per_habit: Daily completions per habit
+    """
+    today = datetime.now()
+    for i in range(habit_count):
+        habit = Habit(f"Habit {i}", "daily" if i % 3 else "weekly")
+        habit.id = f"h{i:07d}"
+        for day in range(completions_per_habit):
+            habit.completions.append(today - timedelta(days=day))
+        db.save_habit(habit)
+
+
+def load_per_habit(db: HabitDatabase) -> List[Habit]:
+    """
+    Reference N+1 loader: one completion query per habit.
+    
+    Args:
+        db: Source database
+        
+    Returns:
+        List[Habit]: Loaded habits
+    """
+    cursor = db.conn.cursor()
+    cursor.execute("SELECT id, name, periodicity, created_at FROM habits")
+    habits = []
+    for row in cursor.fetchall():
+        habit = db._habit_from_row(row)
+        cursor.execute(
+            "SELECT completed_at FROM completions WHERE habit_id = ? ORDER BY completed_at",
+            (habit.id,)
+        )
+        habit.completions = [from_epoch_seconds(c[0]) for c in cursor.fetchall()]
+        habits.append(habit)
+    return habits
+
+
+def timed(func, *args) -> float:
+    """Return the wall-clock seconds taken by func(*args)."""
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def main(sizes: List[int]):
+    """Run the load benchmark for each habit count."""
+    print(f"{'habits':>8} {'per-habit':>10} {'bulk':>10} {'speedup':>8}")
+    for size in sizes:
+        db = HabitDatabase(":memory:")
+        populate(db, size)
+        legacy = timed(load_per_habit, db)
+        bulk = timed(db.load_all_habits)
+        db.close()
+        print(f"{size:>8} {legacy:>9.3f}s {bulk:>9.3f}s {legacy / bulk:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000])
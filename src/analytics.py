@@ -1,10 +1,28 @@
 """
 Analytics module using Functional Programming paradigm.
 Contains pure functions for habit analysis with no side effects.
+
+Time-dependent functions take an optional ``as_of`` reference time. It
+is resolved once per call, so a whole report is evaluated against a
+single frozen instant and is reproducible when as_of is given.
+
+The iter_* variants and the folds (aggregate_*, completion_rates) accept
+any iterable and consume it once, so habits streamed from
+HabitDatabase.iter_habits are analysed in constant memory.
 """
 
-from typing import List, Dict, Any
-from .habit import Habit
+import heapq
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter
+from datetime import date, datetime
+from functools import partial, reduce
+from itertools import accumulate, chain, islice, tee
+from typing import List, Dict, Any, Iterable, Iterator, Optional, NamedTuple, Tuple
+from .bitmap import CompletionBitmap
+from .habit import Habit, is_overdue
+from .streaks import period_index, streak_state
+from . import columnar
 
 
 def get_all_habits(habits: List[Habit]) -> List[Habit]:
@@ -37,12 +55,27 @@ def filter_by_periodicity(habits: List[Habit], period: str) -> List[Habit]:
     return list(filter(lambda h: h.periodicity == period, habits))
 
 
-def get_longest_streak_all(habits: List[Habit]) -> int:
+def iter_by_periodicity(habits: Iterable[Habit], period: str) -> Iterator[Habit]:
     """
-    Get the longest streak among all habits.
+    Lazily filter habits by periodicity.
     
     Args:
-        habits: List of habits
+        habits: Habits (any iterable, consumed once)
+        period: 'daily' or 'weekly'
+        
+    Returns:
+        Iterator[Habit]: Matching habits, produced on demand
+    """
+    return filter(lambda h: h.periodicity == period, habits)
+
+
+def get_longest_streak_all(habits: Iterable[Habit], as_of: Optional[datetime] = None) -> int:
+    """
+    Get the longest streak ever achieved among all habits.
+    
+    Args:
+        habits: Habits (any iterable, consumed once)
+        as_of: Reference time; later completions are ignored
         
     Returns:
         int: Maximum streak length
@@ -50,26 +83,27 @@ def get_longest_streak_all(habits: List[Habit]) -> int:
     Example:
         >>> longest = get_longest_streak_all(habits)
     """
-    streaks = list(map(lambda h: h.get_streak(), habits))
-    return max(streaks) if streaks else 0
+    return max(map(lambda h: h.get_longest_streak(as_of), habits), default=0)
 
 
-def get_longest_streak_for_habit(habits: List[Habit], habit_name: str) -> int:
+def get_longest_streak_for_habit(habits: List[Habit], habit_name: str,
+                                 as_of: Optional[datetime] = None) -> int:
     """
     Get the longest streak for a specific habit.
     
     Args:
         habits: List of habits
         habit_name: Name of the habit
+        as_of: Reference time; later completions are ignored
         
     Returns:
-        int: Streak length for the specified habit
+        int: Longest streak length for the specified habit
         
     Example:
         >>> streak = get_longest_streak_for_habit(habits, "Exercise")
     """
     target_habits = list(filter(lambda h: h.name == habit_name, habits))
-    return target_habits[0].get_streak() if target_habits else 0
+    return target_habits[0].get_longest_streak(as_of) if target_habits else 0
 
 
 def get_daily_habits(habits: List[Habit]) -> List[Habit]:
@@ -98,12 +132,299 @@ def get_weekly_habits(habits: List[Habit]) -> List[Habit]:
     return filter_by_periodicity(habits, "weekly")
 
 
-def analyze_performance(habits: List[Habit]) -> Dict[str, Any]:
+class PerformanceTotals(NamedTuple):
+    """Running totals folded over a habit list by aggregate_performance."""
+    total: int = 0
+    daily: int = 0
+    weekly: int = 0
+    longest_streak: int = 0
+    broken: int = 0
+    streak_sum: int = 0
+
+
+class HabitStats(NamedTuple):
+    """Per-habit report row, computed once per habit."""
+    name: str
+    periodicity: str
+    current_streak: int
+    longest_streak: int
+    broken: bool
+
+
+def habit_stats(habit: Habit, as_of: datetime) -> HabitStats:
+    """
+    Compute the report row for one habit.
+    
+    Args:
+        habit: Habit (or HabitSummary) to evaluate
+        as_of: Reference time for streaks and broken checks
+        
+    Returns:
+        HabitStats: Name, periodicity, streaks and broken flag
+    """
+    return HabitStats(habit.name, habit.periodicity, habit.get_streak(as_of),
+                      habit.get_longest_streak(as_of), habit.is_broken(as_of))
+
+
+def iter_habit_stats(habits: Iterable[Habit], as_of: Optional[datetime] = None) -> Iterator[HabitStats]:
+    """
+    Lazily compute report rows, one habit at a time.
+    
+    Args:
+        habits: Habits (any iterable, consumed once)
+        as_of: Reference time (defaults to now, read once)
+        
+    Returns:
+        Iterator[HabitStats]: Rows in input order, produced on demand
+    """
+    as_of = as_of or datetime.now()
+    return map(lambda h: habit_stats(h, as_of), habits)
+
+
+def collect_habit_stats(habits: List[Habit], as_of: Optional[datetime] = None) -> List[HabitStats]:
+    """
+    Compute the report rows for all habits in one linear pass.
+    
+    Args:
+        habits: List of habits
+        as_of: Reference time (defaults to now, read once)
+        
+    Returns:
+        List[HabitStats]: One row per habit, in input order
+        
+    Example:
+        >>> rows = collect_habit_stats(habits)
+        >>> totals = aggregate_stats(rows)
+    """
+    return list(iter_habit_stats(habits, as_of))
+
+
+def index_by_name(rows: List[HabitStats]) -> Dict[str, HabitStats]:
+    """
+    Build a name -> stats index (the first row wins for duplicate names,
+    as in get_longest_streak_for_habit).
+    
+    Args:
+        rows: Report rows from collect_habit_stats
+        
+    Returns:
+        Dict[str, HabitStats]: Rows keyed by habit name
+    """
+    return dict(map(lambda row: (row.name, row), reversed(rows)))
+
+
+def _fold_stats(totals: PerformanceTotals, row: HabitStats) -> PerformanceTotals:
+    """
+    Fold one report row into the running totals (pure; returns a new tuple).
+    
+    Args:
+        totals: Totals accumulated so far
+        row: Report row to add
+        
+    Returns:
+        PerformanceTotals: Updated totals
+    """
+    return totals._replace(
+        total=totals.total + 1,
+        daily=totals.daily + (row.periodicity == "daily"),
+        weekly=totals.weekly + (row.periodicity == "weekly"),
+        longest_streak=max(totals.longest_streak, row.longest_streak),
+        broken=totals.broken + row.broken,
+        streak_sum=totals.streak_sum + row.current_streak,
+    )
+
+
+def aggregate_stats(rows: Iterable[HabitStats]) -> PerformanceTotals:
+    """
+    Fold report rows into totals in a single traversal.
+    
+    Args:
+        rows: Report rows (any iterable, consumed once)
+        
+    Returns:
+        PerformanceTotals: Counts, longest streak, broken count and streak sum
+    """
+    return reduce(_fold_stats, rows, PerformanceTotals())
+
+
+def iter_with_totals(rows: Iterable[HabitStats]) -> Iterator[Tuple[HabitStats, PerformanceTotals]]:
+    """
+    Pair each report row with the running totals up to and including it.
+    
+    Lets a caller print rows as they stream and still get the summary
+    (the last totals) without a second pass.
+    
+    Args:
+        rows: Report rows (any iterable, consumed once)
+        
+    Returns:
+        Iterator[Tuple[HabitStats, PerformanceTotals]]: (row, totals so far)
+        
+    Example:
+        >>> totals = PerformanceTotals()
+        >>> for row, totals in iter_with_totals(iter_habit_stats(habits)):
+        ...     print(row.name)
+    """
+    rows, folded = tee(rows)
+    return zip(rows, islice(accumulate(folded, _fold_stats, initial=PerformanceTotals()), 1, None))
+
+
+def aggregate_performance(habits: Iterable[Habit], as_of: Optional[datetime] = None) -> PerformanceTotals:
+    """
+    Accumulate every report metric in a single traversal of the habits.
+    
+    Args:
+        habits: Habits (any iterable, consumed once)
+        as_of: Reference time (defaults to now, read once)
+        
+    Returns:
+        PerformanceTotals: Counts, longest streak, broken count and streak sum
+        
+    Example:
+        >>> totals = aggregate_performance(habits)
+        >>> print(totals.broken)
+    """
+    return aggregate_stats(iter_habit_stats(habits, as_of))
+
+
+def merge_totals(left: PerformanceTotals, right: PerformanceTotals) -> PerformanceTotals:
+    """
+    Combine the totals of two disjoint habit lists.
+    
+    Args:
+        left: Totals of the first part
+        right: Totals of the second part
+        
+    Returns:
+        PerformanceTotals: Totals of both parts together
+    """
+    return PerformanceTotals(
+        total=left.total + right.total,
+        daily=left.daily + right.daily,
+        weekly=left.weekly + right.weekly,
+        longest_streak=max(left.longest_streak, right.longest_streak),
+        broken=left.broken + right.broken,
+        streak_sum=left.streak_sum + right.streak_sum,
+    )
+
+
+class _Chunk(NamedTuple):
+    """Completion days of a run of habits, packed into flat arrays for pickling."""
+    names: List[str]
+    periodicities: List[str]
+    ends: array
+    days: array
+
+
+def _pack(habits: List[Habit], as_of: datetime) -> _Chunk:
+    """Pack the completion days (up to as_of) of habits into one chunk."""
+    days = array("i")
+    ends = array("q")
+    for habit in habits:
+        days.extend(habit.completion_days(as_of))
+        ends.append(len(days))
+    return _Chunk([h.name for h in habits], [h.periodicity for h in habits], ends, days)
+
+
+def _chunk_report(chunk, as_of: datetime) -> Tuple[List[HabitStats], PerformanceTotals]:
+    """
+    Worker task: report rows and partial totals of one chunk.
+    
+    Packed chunks are evaluated from their day arrays with the same
+    semantics as habit_stats; plain habit lists (e.g. HabitSummary, which
+    has no history to pack) go through habit_stats directly.
+    """
+    if not isinstance(chunk, _Chunk):
+        rows = collect_habit_stats(chunk, as_of)
+        return rows, aggregate_stats(rows)
+    
+    rows = []
+    start = 0
+    for name, periodicity, end in zip(chunk.names, chunk.periodicities, chunk.ends):
+        days = chunk.days[start:end]
+        state = streak_state(periodicity, days)
+        latest = datetime.fromordinal(days[-1]) if days else None
+        rows.append(HabitStats(name, periodicity, state.current_length,
+                               state.longest, is_overdue(periodicity, latest, as_of)))
+        start = end
+    return rows, aggregate_stats(rows)
+
+
+def collect_habit_stats_parallel(habits: List[Habit], as_of: Optional[datetime] = None,
+                                 workers: int = 2) -> Tuple[List[HabitStats], PerformanceTotals]:
+    """
+    Compute report rows and totals on a pool of worker processes.
+    
+    The habits are split into contiguous chunks whose completion days (up
+    to as_of) are packed into flat arrays; each worker returns the rows
+    and partial totals of its chunk, which are merged in input order.
+    The result is identical to collect_habit_stats plus aggregate_stats.
+    
+    Args:
+        habits: List of habits
+        as_of: Reference time (defaults to now, read once and shared by
+            all workers)
+        workers: Number of worker processes
+        
+    Returns:
+        Tuple: (rows in input order, merged PerformanceTotals)
+        
+    Example:
+        >>> rows, totals = collect_habit_stats_parallel(habits, workers=4)
+    """
+    as_of = as_of or datetime.now()
+    # A few chunks per worker keeps the pool busy when chunks finish unevenly
+    size = max(1, -(-len(habits) // (workers * 4)))
+    chunks = [habits[i:i + size] for i in range(0, len(habits), size)]
+    # Workers get flat day arrays rather than pickled habit objects
+    if all(hasattr(h, "completion_days") for h in habits):
+        chunks = [_pack(chunk, as_of) for chunk in chunks]
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(partial(_chunk_report, as_of=as_of), chunks))
+    
+    rows = [row for chunk_rows, _ in parts for row in chunk_rows]
+    return rows, reduce(merge_totals, map(lambda part: part[1], parts), PerformanceTotals())
+
+
+def format_totals(totals: PerformanceTotals) -> Dict[str, Any]:
+    """
+    Turn folded totals into the analyze_performance report dictionary.
+    
+    Args:
+        totals: Result of aggregate_performance
+        
+    Returns:
+        Dict: Performance metrics
+    """
+    if not totals.total:
+        return {"error": "No habits available"}
+    
+    return {
+        "total_habits": totals.total,
+        "daily_habits": totals.daily,
+        "weekly_habits": totals.weekly,
+        "longest_streak": totals.longest_streak,
+        "broken_habits": totals.broken,
+        "completion_rate": f"{(totals.total - totals.broken) / totals.total * 100:.1f}%",
+        "average_streak": totals.streak_sum / totals.total,
+    }
+
+
+def analyze_performance(habits: List[Habit], as_of: Optional[datetime] = None,
+                        backend: str = "python", workers: int = 1) -> Dict[str, Any]:
     """
     Generate comprehensive performance analytics.
     
     Args:
         habits: List of habits
+        as_of: Reference time for streaks and broken checks (defaults to now,
+            read once for the whole report)
+        backend: 'python', or 'numpy' for the vectorized columnar backend
+            (falls back to 'python' if NumPy is missing or the habits carry
+            no completion history, e.g. HabitSummary)
+        workers: Worker processes for the 'python' backend; above 1 the
+            habits are analysed in parallel chunks with identical results
         
     Returns:
         Dict: Performance metrics
@@ -115,21 +436,294 @@ def analyze_performance(habits: List[Habit]) -> Dict[str, Any]:
     if not habits:
         return {"error": "No habits available"}
     
-    # Calculate metrics using functional programming
-    daily = get_daily_habits(habits)
-    weekly = get_weekly_habits(habits)
-    streaks = list(map(lambda h: h.get_streak(), habits))
-    broken = list(filter(lambda h: h.is_broken(), habits))
+    as_of = as_of or datetime.now()
     
-    return {
-        "total_habits": len(habits),
-        "daily_habits": len(daily),
-        "weekly_habits": len(weekly),
-        "longest_streak": max(streaks) if streaks else 0,
-        "broken_habits": len(broken),
-        "completion_rate": f"{(len(habits) - len(broken)) / len(habits) * 100:.1f}%" if habits else "0%",
-        "average_streak": sum(streaks) / len(streaks) if streaks else 0,
-    }
+    if backend == "numpy" and columnar.HAS_NUMPY and all(hasattr(h, "completion_days") for h in habits):
+        return columnar.analyze_performance_columnar(habits, as_of)
+    
+    if workers > 1:
+        return format_totals(collect_habit_stats_parallel(habits, as_of, workers)[1])
+    
+    return format_totals(aggregate_performance(habits, as_of))
+
+
+# Rolling windows: a number of days ending at as_of, or the calendar
+# week/month containing as_of (up to as_of)
+WINDOWS = {"7d": 7, "30d": 30, "90d": 90, "week": None, "month": None}
+
+
+class CompletionPrefix(NamedTuple):
+    """
+    Prefix sums of completed periods for one habit.
+    
+    sums[i] is the number of completed periods in [base, base + i), so
+    the count over any range of periods is one subtraction.
+    
+    Attributes:
+        periodicity (str): 'daily' or 'weekly'
+        base (int): First period tracked (creation or first completion)
+        sums (List[int]): Prefix sums up to the period containing as_of
+    """
+    periodicity: str
+    base: int
+    sums: List[int]
+    
+    def _offset(self, period: int) -> int:
+        """Clamp a period to an index into sums."""
+        return min(max(period - self.base, 0), len(self.sums) - 1)
+    
+    def completed(self, first: int, last: int) -> int:
+        """Completed periods in [first, last] (O(1))."""
+        return self.sums[self._offset(last + 1)] - self.sums[self._offset(first)]
+    
+    def expected(self, first: int, last: int) -> int:
+        """Periods in [first, last] during which the habit existed (O(1))."""
+        return max(0, self._offset(last + 1) - self._offset(first))
+
+
+def completion_prefix(habit: Habit, as_of: Optional[datetime] = None) -> CompletionPrefix:
+    """
+    Build a habit's prefix sums in one pass over its completion history.
+    
+    Args:
+        habit: Habit with a completion history (not a HabitSummary)
+        as_of: Last moment covered (defaults to now)
+        
+    Returns:
+        CompletionPrefix: Prefix sums from the habit's start to as_of
+    """
+    as_of = as_of or datetime.now()
+    periods = set(map(lambda day: period_index(habit.periodicity, day), habit.completion_days(as_of)))
+    last = period_index(habit.periodicity, as_of.toordinal())
+    base = min(min(periods, default=last), period_index(habit.periodicity, habit.created_at.toordinal()))
+    sums = list(accumulate(map(lambda period: int(period in periods), range(base, last + 1)), initial=0))
+    return CompletionPrefix(habit.periodicity, base, sums)
+
+
+def bitmap_prefix(periodicity: str, created_at: datetime, bitmap: CompletionBitmap,
+                  as_of: Optional[datetime] = None) -> CompletionPrefix:
+    """
+    Build a habit's prefix sums from its stored bitmap instead of its history.
+    
+    Periods after the one containing as_of are ignored; a completion later
+    on as_of's own day (or week) still counts, so this serves live reports.
+    
+    Args:
+        periodicity: 'daily' or 'weekly' (matching the bitmap's granularity)
+        created_at: Habit creation time
+        bitmap: Completed periods, e.g. from HabitDatabase.iter_completion_bitmaps
+        as_of: Last moment covered (defaults to now)
+        
+    Returns:
+        CompletionPrefix: Same prefix sums as completion_prefix
+    """
+    as_of = as_of or datetime.now()
+    last = period_index(periodicity, as_of.toordinal())
+    first = bitmap.base if bitmap.bits else last
+    base = min(first, last, period_index(periodicity, created_at.toordinal()))
+    sums = list(accumulate(map(lambda period: int(bitmap.has_period(period)), range(base, last + 1)),
+                           initial=0))
+    return CompletionPrefix(periodicity, base, sums)
+
+
+def window_bounds(window: str, as_of: datetime) -> Tuple[int, int]:
+    """
+    Get the first and last day (date ordinals, inclusive) of a window.
+    
+    Args:
+        window: Key of WINDOWS ('7d', '30d', '90d', 'week' or 'month')
+        as_of: Reference time; the window ends on its day
+        
+    Returns:
+        Tuple[int, int]: First and last day ordinal
+    """
+    last = as_of.toordinal()
+    if window == "week":
+        return last - as_of.weekday(), last
+    if window == "month":
+        return as_of.replace(day=1).toordinal(), last
+    return last - WINDOWS[window] + 1, last
+
+
+def window_counts(prefix: CompletionPrefix, first_day: int, last_day: int) -> Tuple[int, int]:
+    """
+    Count completed and expected periods of one habit within a window.
+    
+    Weekly habits count every week overlapping the window.
+    
+    Args:
+        prefix: The habit's prefix sums
+        first_day: First day ordinal of the window
+        last_day: Last day ordinal of the window
+        
+    Returns:
+        Tuple[int, int]: (completed periods, expected periods)
+    """
+    first = period_index(prefix.periodicity, first_day)
+    last = period_index(prefix.periodicity, last_day)
+    return prefix.completed(first, last), prefix.expected(first, last)
+
+
+def completion_rates(habits: Iterable[Habit], windows: Iterable[str] = ("7d", "30d", "90d"),
+                     as_of: Optional[datetime] = None) -> Dict[str, float]:
+    """
+    Completion rate of all habits over rolling windows.
+    
+    Each habit's prefix sums are built once; every window is then answered
+    in O(1) per habit. A habit only counts from its creation or first
+    completion, whichever is earlier.
+    
+    Args:
+        habits: Habits with completion history (any iterable, consumed once)
+        windows: Keys of WINDOWS
+        as_of: Reference time (defaults to now, read once)
+        
+    Returns:
+        Dict[str, float]: Percentage of expected periods completed, per window
+        
+    Example:
+        >>> rates = completion_rates(habits, ["7d", "month"])
+        >>> print(f"{rates['7d']:.1f}%")
+    """
+    as_of = as_of or datetime.now()
+    return prefix_rates(map(lambda h: completion_prefix(h, as_of), habits), windows, as_of)
+
+
+def prefix_rates(prefixes: Iterable[CompletionPrefix], windows: Iterable[str],
+                 as_of: datetime) -> Dict[str, float]:
+    """
+    Completion rate over rolling windows from per-habit prefix sums.
+    
+    Args:
+        prefixes: One CompletionPrefix per habit (any iterable, consumed once)
+        windows: Keys of WINDOWS
+        as_of: Reference time the prefixes were built for
+        
+    Returns:
+        Dict[str, float]: Percentage of expected periods completed, per window
+    """
+    bounds = {window: window_bounds(window, as_of) for window in windows}
+    
+    def fold(totals, prefix):
+        return {window: tuple(map(sum, zip(totals[window], window_counts(prefix, *bounds[window]))))
+                for window in bounds}
+    
+    totals = reduce(fold, prefixes, {window: (0, 0) for window in bounds})
+    return {window: done / expected * 100 if expected else 0.0
+            for window, (done, expected) in totals.items()}
+
+
+# Completion histograms: weekday (0 = Monday), hour of day, ISO week label
+HISTOGRAMS = ("weekday", "hour", "week")
+
+WEEKDAY_NAMES = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+
+def week_label(monday: int) -> str:
+    """
+    ISO week label of the week starting on a Monday.
+    
+    Args:
+        monday: Date ordinal of the week's Monday
+        
+    Returns:
+        str: Label such as '2024-W01'
+    """
+    year, week, _ = date.fromordinal(monday).isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def _completion_buckets(moment: datetime) -> Tuple[int, int, str]:
+    """Weekday, hour and ISO week label of one completion."""
+    weekday = moment.weekday()
+    return weekday, moment.hour, week_label(moment.toordinal() - weekday)
+
+
+def completion_histograms(habits: Iterable[Habit], kinds: Iterable[str] = HISTOGRAMS,
+                          as_of: Optional[datetime] = None,
+                          names: Optional[Iterable[str]] = None) -> Dict[str, Dict[Any, int]]:
+    """
+    Count completions by weekday, hour of day and ISO week in one pass.
+    
+    CompactHabit only keeps days, so its completions all fall in hour 0.
+    HabitDatabase.completion_histogram computes the same counts with a SQL
+    GROUP BY, without loading any history.
+    
+    Args:
+        habits: Habits with completion history (any iterable, consumed once)
+        kinds: Keys of HISTOGRAMS to compute
+        as_of: Ignore completions after this time (defaults to now)
+        names: Only count these habits (defaults to all)
+        
+    Returns:
+        Dict[str, Dict[Any, int]]: Per kind, counts by bucket in bucket order
+        
+    Raises:
+        ValueError: If a kind is not a key of HISTOGRAMS
+        
+    Example:
+        >>> by_hour = completion_histograms(habits, ["hour"])["hour"]
+        >>> print(by_hour.get(7, 0))
+    """
+    as_of = as_of or datetime.now()
+    kinds = list(kinds)
+    unknown = set(kinds) - set(HISTOGRAMS)
+    if unknown:
+        raise ValueError(f"Unknown histogram: {', '.join(sorted(unknown))}")
+    selected = None if names is None else set(names)
+    habits = filter(lambda h: selected is None or h.name in selected, habits)
+    moments = filter(lambda moment: moment <= as_of, chain.from_iterable(map(lambda h: h.completions, habits)))
+    
+    counters = [Counter() for _ in HISTOGRAMS]
+    for buckets in map(_completion_buckets, moments):
+        for counter, bucket in zip(counters, buckets):
+            counter[bucket] += 1
+    return {kind: dict(sorted(counters[HISTOGRAMS.index(kind)].items())) for kind in kinds}
+
+
+STREAK_KINDS = ("current", "longest")
+
+
+class LeaderboardEntry(NamedTuple):
+    """One ranked habit of a streak leaderboard."""
+    name: str
+    periodicity: str
+    streak: int
+
+
+def top_streaks(habits: Iterable[Habit], k: int = 10, by: str = "current",
+                as_of: Optional[datetime] = None) -> List[LeaderboardEntry]:
+    """
+    Rank the k habits with the highest streaks using a bounded heap.
+    
+    Only k entries are kept while the habits stream past, so ranking n
+    habits costs O(n log k) instead of a full sort. Ties keep input order.
+    
+    Args:
+        habits: Habits or summaries (any iterable, consumed once)
+        k: Number of entries to return
+        by: 'current' or 'longest' streak
+        as_of: Reference time; later completions are ignored (defaults to all)
+        
+    Returns:
+        List[LeaderboardEntry]: Up to k entries, highest streak first
+        
+    Raises:
+        ValueError: If by is not a known streak kind
+        
+    Example:
+        >>> for entry in top_streaks(habits, 3, by="longest"):
+        ...     print(entry.name, entry.streak)
+    """
+    if by not in STREAK_KINDS:
+        raise ValueError(f"Unknown streak kind: {by}")
+    
+    if by == "current":
+        streak = lambda h: h.get_streak(as_of)
+    else:
+        streak = lambda h: h.get_longest_streak(as_of)
+    entries = map(lambda h: LeaderboardEntry(h.name, h.periodicity, streak(h)), habits)
+    return heapq.nlargest(k, entries, key=lambda entry: entry.streak)
 
 
 def get_habit_names(habits: List[Habit]) -> List[str]:
@@ -0,0 +1,157 @@
+"""
+Asyncio interface to the SQLite habit storage.
+Runs all database work on a dedicated thread so the event loop never blocks.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, List, Optional, Tuple
+from .habit import Habit
+from .storage import HabitDatabase
+
+
+class AsyncHabitDatabase:
+    """
+    Awaitable wrapper around HabitDatabase.
+    
+    The connection lives on a single executor thread, which also orders
+    every operation. Completions added by concurrent coroutines are
+    coalesced: calls made in the same event loop iteration are written
+    together in one transaction.
+    
+    Example:
+        >>> async with AsyncHabitDatabase("habits.db") as db:
+        ...     await db.add_completion(habit_id)
+    """
+    
+    def __init__(self, db_path: str = "habits.db", **options: Any):
+        """
+        Open the database on the executor thread.
+        
+        Args:
+            db_path: Path to SQLite database file
+            **options: Extra keyword arguments for HabitDatabase
+        """
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="habit-db")
+        self._db: Optional[HabitDatabase] = None
+        self._opened = self._executor.submit(self._open, db_path, options)
+        self._pending: List[Tuple[Tuple[str, datetime], asyncio.Future]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+    
+    def _open(self, db_path: str, options: dict):
+        """Create the connection (runs on the executor thread)."""
+        self._db = HabitDatabase(db_path, **options)
+    
+    def _call(self, method: str, *args: Any) -> Any:
+        """Invoke a HabitDatabase method (runs on the executor thread)."""
+        self._opened.result()
+        return getattr(self._db, method)(*args)
+    
+    async def _run(self, func: Callable, *args: Any) -> Any:
+        """Run a blocking function on the executor thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, partial(func, *args))
+    
+    async def save_habit(self, habit: Habit):
+        """
+        Save or update a habit.
+        
+        Args:
+            habit: Habit object to save
+        """
+        await self.flush()
+        await self._run(self._call, "save_habit", habit)
+    
+    async def load_all_habits(self) -> List[Habit]:
+        """
+        Load all habits with their completions.
+        
+        Returns:
+            List[Habit]: List of all habits
+        """
+        await self.flush()
+        return await self._run(self._call, "load_all_habits")
+    
+    async def delete_habit(self, habit_id: str):
+        """
+        Delete a habit and its completions.
+        
+        Args:
+            habit_id: ID of the habit to delete
+        """
+        await self.flush()
+        await self._run(self._call, "delete_habit", habit_id)
+    
+    async def add_completion(self, habit_id: str, completed_at: Optional[datetime] = None):
+        """
+        Append a completion, batched with other concurrent calls.
+        
+        Args:
+            habit_id: ID of the completed habit
+            completed_at: Completion time (defaults to now)
+        """
+        if completed_at is None:
+            completed_at = datetime.now()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append(((habit_id, completed_at), future))
+        if self._flush_task is None:
+            self._flush_task = asyncio.ensure_future(self._flush_soon())
+        await future
+    
+    async def _flush_soon(self):
+        """Yield once so concurrent callers can join the batch, then write it."""
+        await asyncio.sleep(0)
+        self._flush_task = None
+        await self.flush()
+    
+    async def flush(self):
+        """
+        Write all queued completions in a single transaction.
+        
+        If the batch fails (e.g. one unknown habit id rolls it back), its
+        completions are retried one by one, so only the callers whose own
+        completion is invalid see the error.
+        """
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            await self._run(self._call, "add_completions", [item for item, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                _settle(batch[0][1], e)
+                return
+            for item, future in batch:
+                try:
+                    await self._run(self._call, "add_completions", [item])
+                except Exception as item_error:
+                    _settle(future, item_error)
+                else:
+                    _settle(future)
+            return
+        for _, future in batch:
+            _settle(future)
+    
+    async def close(self):
+        """Flush pending writes, close the connection and stop the thread."""
+        await self.flush()
+        await self._run(self._call, "close")
+        self._executor.shutdown(wait=True)
+    
+    async def __aenter__(self) -> 'AsyncHabitDatabase':
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+
+def _settle(future: asyncio.Future, error: Optional[BaseException] = None):
+    """Resolve a caller's future (with error if given) unless it was cancelled."""
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
@@ -0,0 +1,179 @@
+"""
+Completion bitmap index.
+Stores the set of completed periods of a habit as bits of one integer.
+"""
+
+from datetime import date
+from typing import Iterable, Union
+from .streaks import period_index
+
+# Granularity of a bitmap and the periodicity whose periods it indexes
+GRANULARITIES = {"day": "daily", "week": "weekly"}
+
+# Granularity of the bitmap that indexes each periodicity
+PERIODICITY_GRANULARITY = {periodicity: granularity for granularity, periodicity in GRANULARITIES.items()}
+
+
+class CompletionBitmap:
+    """
+    Bit set of completed days or ISO weeks.
+    
+    Bit ``i`` stands for period ``base + i`` (a date ordinal for 'day',
+    a Monday-based week number for 'week'). Duplicate completions in a
+    period set the same bit, membership is a shift and mask, and streaks
+    and range counts are evaluated with integer bit operations.
+    
+    Attributes:
+        granularity (str): 'day' or 'week'
+        base (int): Period stored in bit 0
+        bits (int): Bit set of completed periods
+    """
+    
+    __slots__ = ("granularity", "base", "bits")
+    
+    def __init__(self, granularity: str = "day", base: int = 0, bits: int = 0):
+        """
+        Initialize a bitmap.
+        
+        Args:
+            granularity: 'day' or 'week'
+            base: Period stored in bit 0
+            bits: Initial bit set
+            
+        Raises:
+            ValueError: If granularity is not 'day' or 'week'
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError("Granularity must be 'day' or 'week'")
+        self.granularity = granularity
+        self.base = base
+        self.bits = bits
+    
+    @classmethod
+    def from_days(cls, granularity: str, days: Iterable[int]) -> 'CompletionBitmap':
+        """
+        Build a bitmap from date ordinals.
+        
+        Args:
+            granularity: 'day' or 'week'
+            days: Completion days as date ordinals (any order)
+            
+        Returns:
+            CompletionBitmap: Bitmap with every period of days set
+        """
+        bitmap = cls(granularity)
+        for day in days:
+            bitmap.add_day(day)
+        return bitmap
+    
+    def period_of(self, day: Union[date, int]) -> int:
+        """Period number containing a date (or date ordinal)."""
+        ordinal = day if isinstance(day, int) else day.toordinal()
+        return period_index(GRANULARITIES[self.granularity], ordinal)
+    
+    def add_day(self, day: Union[date, int]) -> None:
+        """
+        Mark the period containing a date as completed.
+        
+        Args:
+            day: date, datetime or date ordinal
+        """
+        period = self.period_of(day)
+        if not self.bits:
+            self.base = period
+        elif period < self.base:
+            self.bits <<= self.base - period
+            self.base = period
+        self.bits |= 1 << (period - self.base)
+    
+    def contains(self, day: Union[date, int]) -> bool:
+        """
+        Check whether the period containing a date was completed.
+        
+        Args:
+            day: date, datetime or date ordinal
+            
+        Returns:
+            bool: True if any completion fell in that period
+        """
+        return self.has_period(self.period_of(day))
+    
+    def count_between(self, start: Union[date, int], end: Union[date, int]) -> int:
+        """
+        Count completed periods between two dates (inclusive).
+        
+        Args:
+            start: First date of the range
+            end: Last date of the range
+            
+        Returns:
+            int: Number of completed periods in the range
+        """
+        low = max(self.period_of(start) - self.base, 0)
+        high = self.period_of(end) - self.base
+        if high < low:
+            return 0
+        window = (self.bits >> low) & ((1 << (high - low + 1)) - 1)
+        return bin(window).count("1")
+    
+    def current_streak(self) -> int:
+        """
+        Length of the run of consecutive periods ending at the latest one.
+        
+        Returns:
+            int: Current streak (0 if empty)
+        """
+        if not self.bits:
+            return 0
+        top = self.bits.bit_length()
+        gaps = self.bits ^ ((1 << top) - 1)
+        return top - gaps.bit_length()
+    
+    def longest_streak(self) -> int:
+        """
+        Length of the longest run of consecutive periods.
+        
+        Returns:
+            int: Longest streak (0 if empty)
+        """
+        bits, longest = self.bits, 0
+        while bits:
+            bits &= bits << 1
+            longest += 1
+        return longest
+    
+    def has_period(self, period: int) -> bool:
+        """Check whether a period number (see period_of) was completed."""
+        offset = period - self.base
+        return offset >= 0 and bool(self.bits >> offset & 1)
+    
+    def latest_period(self) -> int:
+        """Most recent completed period (-1 if empty)."""
+        return self.base + self.bits.bit_length() - 1 if self.bits else -1
+    
+    def to_bytes(self) -> bytes:
+        """Serialize the bit set (little endian)."""
+        return self.bits.to_bytes((self.bits.bit_length() + 7) // 8, "little")
+    
+    @classmethod
+    def from_bytes(cls, granularity: str, base: int, data: bytes) -> 'CompletionBitmap':
+        """
+        Rebuild a bitmap from to_bytes output.
+        
+        Args:
+            granularity: 'day' or 'week'
+            base: Period stored in bit 0
+            data: Serialized bit set
+            
+        Returns:
+            CompletionBitmap: Restored bitmap
+        """
+        return cls(granularity, base, int.from_bytes(data, "little"))
+    
+    def __len__(self) -> int:
+        """Number of completed periods."""
+        return bin(self.bits).count("1")
+    
+    def __repr__(self) -> str:
+        """Official representation."""
+        return f"CompletionBitmap(granularity='{self.granularity}', base={self.base}, periods={len(self)})"
@@ -5,15 +5,71 @@ Provides user-friendly commands for habit management.
 
 import click
 from datetime import datetime, timedelta
+from itertools import chain
 from .habit import Habit
-from .storage import HabitDatabase
+from .storage import HabitDatabase, ShardedHabitDatabase
 from .analytics import *
 
+# Sharded storage used when a --user is given
+SHARD_DIR = "habit_shards"
+SHARD_COUNT = 8
+
+
+def open_database() -> HabitDatabase:
+    """Open habits.db, or the selected user's shard when --user is given."""
+    user = click.get_current_context().obj.get("user")
+    if user is None:
+        return HabitDatabase()
+    return ShardedHabitDatabase(SHARD_DIR, SHARD_COUNT).for_user(user)
+
+
+WINDOW_LABELS = {"7d": "last 7 days", "30d": "last 30 days", "90d": "last 90 days",
+                 "week": "this week", "month": "this month"}
+
+
+def load_report_habits(db: HabitDatabase, as_of, history: bool = False, stream: bool = False):
+    """
+    Precomputed summaries for live reports, full histories for --as-of or when requested.
+    
+    With stream=True the habits are yielded lazily in chunks instead of as a list.
+    """
+    if as_of is None and not history:
+        return db.iter_habit_summaries() if stream else db.load_habit_summaries()
+    return db.iter_habits() if stream else db.load_all_habits()
+
+
+def cached_report(db: HabitDatabase, key: str, build, refresh: bool = False) -> list:
+    """
+    Report lines from the database's cache, or built and stored on a miss.
+    
+    Args:
+        db: Open database (its data version invalidates the cache)
+        key: Report variant (command and options)
+        build: Called without arguments to compute the lines on a miss
+        refresh: Rebuild (and re-store) even if the report is cached
+        
+    Returns:
+        list: Lines to print
+    """
+    lines = None if refresh else db.get_cached_report(key)
+    if lines is None:
+        lines = build()
+        db.put_cached_report(key, lines)
+    return lines
+
+
+def report_key(command: str, as_of, live: bool, *options: str) -> str:
+    """Cache key of a report variant; live reports are keyed by their day, as status is day-granular."""
+    moment = f"live:{as_of.date().isoformat()}" if live else as_of.isoformat()
+    return "|".join((command, moment) + options)
+
 
 @click.group()
-def cli():
+@click.option('--user', default=None, help='User whose habits to manage (uses sharded storage)')
+@click.pass_context
+def cli(ctx, user):
     """Habit Tracker CLI - Manage your daily and weekly habits."""
-    pass
+    ctx.obj = {"user": user}
 
 
 @cli.command()
@@ -24,7 +80,7 @@ def create(name, periodicity):
     """Create a new habit."""
     try:
         habit = Habit(name, periodicity)
-        db = HabitDatabase()
+        db = open_database()
         db.save_habit(habit)
         db.close()
         click.echo(f"✅ Created: {habit}")
@@ -37,76 +93,243 @@ def create(name, periodicity):
 def complete(name):
     """Mark a habit as completed today."""
     try:
-        db = HabitDatabase()
-        habits = db.load_all_habits()
-        
-        found = False
-        for habit in habits:
-            if habit.name == name:
-                habit.complete()
-                db.save_habit(habit)
-                click.echo(f"✅ Completed: {name}")
-                found = True
-                break
+        db = open_database()
+        habit = db.get_habit_by_name(name, load_completions=False)
         
-        if not found:
+        if habit is None:
             click.echo(f"❌ Habit '{name}' not found")
+        else:
+            habit.complete()
+            db.save_habit(habit)
+            click.echo(f"✅ Completed: {name}")
         
         db.close()
     except Exception as e:
         click.echo(f"❌ Error: {e}")
 
 
+@cli.command(name='import')
+@click.option('--file', 'path', required=True, type=click.Path(exists=True, dir_okay=False),
+              help='CSV or JSONL file with name, periodicity, completed_at')
+@click.option('--format', 'file_format', type=click.Choice(['csv', 'jsonl']),
+              help='File format (defaults to the file extension)')
+@click.option('--batch-size', default=10000, show_default=True, help='Completions per batch')
+def import_data(path, file_format, batch_size):
+    """Import habits and completion history from a file."""
+    try:
+        db = open_database()
+        result = db.bulk_import(
+            path, file_format, batch_size,
+            progress=lambda count: click.echo(f"  … {count} completions imported")
+        )
+        db.close()
+        click.echo(f"✅ Imported {result['completions_imported']} completions "
+                   f"({result['habits_created']} new habits)")
+    except Exception as e:
+        click.echo(f"❌ Error: {e}")
+
+
 @cli.command(name='list')
-def list_habits():
+@click.option('--as-of', type=click.DateTime(), help='Evaluate status at this time instead of now')
+@click.option('--stream', is_flag=True, help='Stream habits in chunks with constant memory (bypasses the cache)')
+def list_habits(as_of, stream):
     """List all habits with their current status."""
     try:
-        db = HabitDatabase()
-        habits = db.load_all_habits()
-        db.close()
-        
-        if not habits:
-            click.echo("📭 No habits found. Create one with 'create' command.")
-            return
+        # Freeze the reference time for the whole listing
+        live, as_of = as_of is None, as_of or datetime.now()
+        db = open_database()
+        if stream:
+            lines = iter_list_lines(load_report_habits(db, None if live else as_of, stream=True), as_of)
+        else:
+            lines = cached_report(db, report_key("list", as_of, live),
+                                  lambda: list(iter_list_lines(load_report_habits(db, None if live else as_of),
+                                                               as_of)))
         
-        click.echo("📋 Your Habits:")
-        for i, habit in enumerate(habits, 1):
-            click.echo(f"  {i}. {habit}")
+        for line in lines:
+            click.echo(line)
+        db.close()
     except Exception as e:
         click.echo(f"❌ Error: {e}")
 
 
+def iter_list_lines(habits, as_of: datetime):
+    """Lines of the list report, produced as the habits arrive."""
+    count = 0
+    for count, habit in enumerate(habits, 1):
+        if count == 1:
+            yield "📋 Your Habits:"
+        yield f"  {count}. {habit.describe(as_of)}"
+    if not count:
+        yield "📭 No habits found. Create one with 'create' command."
+
+
 @cli.command()
-def analytics():
+@click.option('--as-of', type=click.DateTime(), help='Evaluate the report at this time instead of now')
+@click.option('--workers', default=1, show_default=True, type=click.IntRange(min=1),
+              help='Worker processes for large reports')
+@click.option('--window', 'windows', multiple=True, type=click.Choice(list(WINDOWS)),
+              help='Also report the completion rate over this window (repeatable)')
+@click.option('--sql', is_flag=True, help='Compute streaks inside SQLite instead of loading histories')
+@click.option('--no-cache', is_flag=True, help='Recompute even if a cached report exists')
+@click.option('--stream', is_flag=True,
+              help='Stream habits in chunks with constant memory; rows are printed before the summary')
+@click.option('--histogram', 'histograms', multiple=True, type=click.Choice(HISTOGRAMS),
+              help='Also show when completions happen by weekday, hour or week (repeatable)')
+@click.option('--habit', 'names', multiple=True, help='Restrict histograms to this habit (repeatable)')
+def analytics(as_of, workers, windows, sql, no_cache, stream, histograms, names):
     """Show detailed habit analytics."""
     try:
-        db = HabitDatabase()
-        habits = db.load_all_habits()
+        # Freeze the reference time for the whole report
+        live, as_of = as_of is None, as_of or datetime.now()
+        db = open_database()
+        if stream:
+            lines = chain(iter_analytics_lines(db, as_of, live, windows),
+                          histogram_lines(db, as_of, histograms, names))
+        else:
+            key = report_key("analytics", as_of, live, *windows, *histograms, *(f"habit={n}" for n in names),
+                             *(["sql"] if sql else []))
+            lines = cached_report(db, key,
+                                  lambda: analytics_lines(db, as_of, live, workers, windows, sql)
+                                  + histogram_lines(db, as_of, histograms, names),
+                                  refresh=no_cache)
+        
+        for line in lines:
+            click.echo(line)
+        db.close()
+    except Exception as e:
+        click.echo(f"❌ Error: {e}")
+
+
+def analytics_lines(db: HabitDatabase, as_of: datetime, live: bool, workers: int = 1,
+                    windows=(), sql: bool = False) -> list:
+    """Compute the analytics report and render it as lines."""
+    # Completion histories are only loaded when something needs them
+    habits = None
+    if (windows and not live) or not sql:
+        habits = load_report_habits(db, None if live else as_of, history=bool(windows) and not live)
+    
+    # Streaks are computed once per habit; summary and rows share them
+    if sql:
+        rows = db.load_streak_stats(as_of, clamp=live)
+    elif workers > 1:
+        rows = collect_habit_stats_parallel(habits, as_of, workers)[0]
+    else:
+        rows = collect_habit_stats(habits, as_of)
+    
+    if not rows:
+        return ["📊 No habits to analyze."]
+    
+    lines = ["📊 Analytics Report:"] + summary_lines(format_totals(aggregate_stats(rows)))
+    if windows:
+        lines += rate_lines(window_rates(db, as_of, live, windows, habits))
+    lines.append("\n  Individual Habits:")
+    lines.extend(map(row_line, rows))
+    return lines
+
+
+def iter_analytics_lines(db: HabitDatabase, as_of: datetime, live: bool, windows=()):
+    """
+    Stream the analytics report in constant memory.
+    
+    Rows are printed as habits arrive and the summary follows from the
+    running totals; window rates take a second streaming pass.
+    """
+    totals = PerformanceTotals()
+    rows = iter_habit_stats(load_report_habits(db, None if live else as_of, stream=True), as_of)
+    for row, totals in iter_with_totals(rows):
+        if totals.total == 1:
+            yield "📊 Analytics Report:"
+            yield "  Individual Habits:"
+        yield row_line(row)
+    
+    if not totals.total:
+        yield "📊 No habits to analyze."
+        return
+    
+    yield "\n  Summary:"
+    yield from summary_lines(format_totals(totals))
+    if windows:
+        yield from rate_lines(window_rates(db, as_of, live, windows))
+
+
+def window_rates(db: HabitDatabase, as_of: datetime, live: bool, windows, habits=None) -> dict:
+    """Completion rates from stored bitmaps when live, else from (streamed) histories."""
+    if live:
+        prefixes = (bitmap_prefix(*row, as_of) for row in db.iter_completion_bitmaps())
+        return prefix_rates(prefixes, windows, as_of)
+    return completion_rates(db.iter_habits() if habits is None else habits, windows, as_of)
+
+
+def histogram_lines(db: HabitDatabase, as_of: datetime, kinds=(), names=()) -> list:
+    """Completion histogram lines, counted inside SQLite."""
+    if not kinds:
+        return []
+    lines = []
+    for kind, counts in db.completion_histograms(kinds, as_of, names or None).items():
+        lines.append(f"\n  Completions by {kind}:")
+        if not counts:
+            lines.append("    (none)")
+        lines.extend(f"    {bucket_label(kind, bucket)}: {count}" for bucket, count in counts.items())
+    return lines
+
+
+def bucket_label(kind: str, bucket) -> str:
+    """Display label of a histogram bucket."""
+    if kind == "weekday":
+        return WEEKDAY_NAMES[bucket]
+    if kind == "hour":
+        return f"{bucket:02d}:00"
+    return bucket
+
+
+def summary_lines(stats: dict) -> list:
+    """Summary metric lines of the analytics report."""
+    return [
+        f"  Total habits: {stats['total_habits']}",
+        f"  Daily habits: {stats['daily_habits']}",
+        f"  Weekly habits: {stats['weekly_habits']}",
+        f"  Longest streak: {stats['longest_streak']}",
+        f"  Broken habits: {stats['broken_habits']}",
+        f"  Completion rate: {stats['completion_rate']}",
+        f"  Average streak: {stats['average_streak']:.1f}",
+    ]
+
+
+def rate_lines(rates: dict) -> list:
+    """Completion-rate lines, one per window."""
+    return ["\n  Completion rates:"] + [f"    • {WINDOW_LABELS[window]}: {rate:.1f}%"
+                                     for window, rate in rates.items()]
+
+
+def row_line(row: HabitStats) -> str:
+    """Individual habit line of the analytics report."""
+    return f"    • {row.name}: Current streak {row.current_streak}, Longest {row.longest_streak}"
+
+
+@cli.command()
+@click.option('--top', 'k', default=10, show_default=True, type=click.IntRange(min=1),
+              help='Number of habits to rank')
+@click.option('--by', type=click.Choice(STREAK_KINDS), default='current', show_default=True,
+              help='Rank by current or longest streak')
+@click.option('--as-of', type=click.DateTime(), help='Rank at this time instead of now')
+def leaderboard(k, by, as_of):
+    """Show the habits with the highest streaks."""
+    try:
+        db = open_database()
+        # Live rankings come straight from the precomputed statistics
+        if as_of is None:
+            entries = db.top_streaks(k, by)
+        else:
+            entries = top_streaks(db.iter_habits(), k, by, as_of)
         db.close()
         
-        if not habits:
-            click.echo("📊 No habits to analyze.")
+        if not entries:
+            click.echo("🏆 No habits to rank.")
             return
         
-        # Use functional programming functions
-        daily = get_daily_habits(habits)
-        weekly = get_weekly_habits(habits)
-        longest_all = get_longest_streak_all(habits)
-        stats = analyze_performance(habits)
-        
-        click.echo("📊 Analytics Report:")
-        click.echo(f"  Total habits: {stats['total_habits']}")
-        click.echo(f"  Daily habits: {stats['daily_habits']}")
-        click.echo(f"  Weekly habits: {stats['weekly_habits']}")
-        click.echo(f"  Longest streak: {stats['longest_streak']}")
-        click.echo(f"  Broken habits: {stats['broken_habits']}")
-        click.echo(f"  Completion rate: {stats['completion_rate']}")
-        click.echo(f"  Average streak: {stats['average_streak']:.1f}")
-        
-        click.echo("\n  Individual Habits:")
-        for habit in habits:
-            longest = get_longest_streak_for_habit(habits, habit.name)
-            click.echo(f"    • {habit.name}: Current streak {habit.get_streak()}, Longest {longest}")
+        click.echo(f"🏆 Top {len(entries)} by {by} streak:")
+        for rank, entry in enumerate(entries, 1):
+            click.echo(f"  {rank}. {entry.name} ({entry.periodicity}): {entry.streak}")
     except Exception as e:
         click.echo(f"❌ Error: {e}")
 
@@ -123,7 +346,7 @@ def generate_test_data():
             Habit("Family Dinner", "weekly"),
         ]
         
-        db = HabitDatabase()
+        db = open_database()
         end_date = datetime.now()
         start_date = end_date - timedelta(weeks=4)
         
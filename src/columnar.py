@@ -0,0 +1,117 @@
+"""
+Columnar analytics backend using NumPy.
+Computes analyze_performance metrics with vectorized array operations.
+
+NumPy is optional: HAS_NUMPY is False when it is not installed and
+analytics.analyze_performance then stays on the pure-Python path.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+HAS_NUMPY = np is not None
+
+
+def habits_to_columns(habits: List[Any], as_of: datetime) -> Tuple[Any, Any, Any]:
+    """
+    Flatten habits into column arrays.
+    
+    Args:
+        habits: Habit objects (must provide completion_days)
+        as_of: Completions after this time are left out
+        
+    Returns:
+        Tuple: (is_daily per habit, habit index per completion,
+        day ordinal per completion) as NumPy arrays
+    """
+    is_daily = np.fromiter((h.periodicity == "daily" for h in habits), dtype=bool, count=len(habits))
+    day_lists = [np.asarray(h.completion_days(as_of), dtype=np.int64) for h in habits]
+    counts = np.fromiter((len(days) for days in day_lists), dtype=np.int64, count=len(habits))
+    habit_index = np.repeat(np.arange(len(habits), dtype=np.int64), counts)
+    days = np.concatenate(day_lists) if day_lists else np.empty(0, dtype=np.int64)
+    return is_daily, habit_index, days
+
+
+def streak_columns(is_daily, habit_index, days) -> Tuple[Any, Any, Any]:
+    """
+    Compute per-habit current streak, longest streak and latest day.
+    
+    Completions are bucketed into periods (day ordinal, or Monday-based
+    week for weekly habits), de-duplicated, and split into runs of
+    consecutive periods with a cumulative sum over run boundaries.
+    
+    Args:
+        is_daily: Boolean array, one entry per habit
+        habit_index: Habit index of each completion
+        days: Day ordinal of each completion
+        
+    Returns:
+        Tuple: (current, longest, latest_day) arrays, one entry per habit;
+        latest_day is -1 for habits without completions
+    """
+    habit_count = len(is_daily)
+    current = np.zeros(habit_count, dtype=np.int64)
+    longest = np.zeros(habit_count, dtype=np.int64)
+    latest = np.full(habit_count, -1, dtype=np.int64)
+    if len(days) == 0:
+        return current, longest, latest
+    
+    periods = np.where(is_daily[habit_index], days, (days - 1) // 7)
+    order = np.lexsort((days, habit_index))
+    habit_sorted, periods_sorted = habit_index[order], periods[order]
+    
+    np.maximum.at(latest, habit_index, days)
+    
+    # Collapse repeated completions within one period
+    keep = np.ones(len(order), dtype=bool)
+    keep[1:] = (habit_sorted[1:] != habit_sorted[:-1]) | (periods_sorted[1:] != periods_sorted[:-1])
+    habit_sorted, periods_sorted = habit_sorted[keep], periods_sorted[keep]
+    
+    # A run starts at a new habit or after a gap of more than one period
+    starts = np.ones(len(habit_sorted), dtype=bool)
+    starts[1:] = (habit_sorted[1:] != habit_sorted[:-1]) | (periods_sorted[1:] - periods_sorted[:-1] != 1)
+    run_id = np.cumsum(starts) - 1
+    run_length = np.bincount(run_id)
+    run_habit = habit_sorted[starts]
+    
+    np.maximum.at(longest, run_habit, run_length)
+    last_run = np.ones(len(run_habit), dtype=bool)
+    last_run[:-1] = run_habit[1:] != run_habit[:-1]
+    current[run_habit[last_run]] = run_length[last_run]
+    return current, longest, latest
+
+
+def analyze_performance_columnar(habits: List[Any], as_of: datetime) -> Dict[str, Any]:
+    """
+    Vectorized equivalent of analytics.analyze_performance.
+    
+    Args:
+        habits: Non-empty list of Habit objects
+        as_of: Reference time for streaks and broken checks
+        
+    Returns:
+        Dict: The same metrics as analyze_performance
+    """
+    is_daily, habit_index, days = habits_to_columns(habits, as_of)
+    current, longest, latest = streak_columns(is_daily, habit_index, days)
+    
+    allowed_gap = np.where(is_daily, 1, 7)
+    broken = (latest < 0) | (as_of.toordinal() - latest > allowed_gap)
+    
+    total = len(habits)
+    daily_count = int(is_daily.sum())
+    broken_count = int(broken.sum())
+    return {
+        "total_habits": total,
+        "daily_habits": daily_count,
+        "weekly_habits": total - daily_count,
+        "longest_streak": int(longest.max()),
+        "broken_habits": broken_count,
+        "completion_rate": f"{(total - broken_count) / total * 100:.1f}%",
+        "average_streak": int(current.sum()) / total,
+    }
@@ -3,9 +3,134 @@ Habit class using Object-Oriented Programming.
 Defines the core Habit entity with tracking capabilities.
 """
 
+import bisect
 import uuid
-from datetime import datetime, timedelta
-from typing import List, Optional
+import weakref
+from array import array
+from datetime import date, datetime, timedelta
+from typing import List, Optional, Tuple
+from .bitmap import CompletionBitmap
+from .streaks import StreakRun, StreakState, extend_state, find_runs, streak_state
+
+# Reference point for compact integer timestamps (naive, no timezone shift)
+EPOCH = datetime(1970, 1, 1)
+
+SECONDS_PER_DAY = 86400
+
+
+def to_epoch_seconds(moment: datetime) -> int:
+    """
+    Encode a naive datetime as whole seconds since EPOCH.
+    
+    Args:
+        moment: Time to encode (sub-second precision is dropped)
+        
+    Returns:
+        int: Seconds since 1970-01-01 00:00:00
+    """
+    return (moment - EPOCH) // timedelta(seconds=1)
+
+
+def from_epoch_seconds(seconds: int) -> datetime:
+    """
+    Decode seconds since EPOCH back into a naive datetime.
+    
+    Args:
+        seconds: Value produced by to_epoch_seconds
+        
+    Returns:
+        datetime: Decoded time
+    """
+    return EPOCH + timedelta(seconds=seconds)
+
+
+def is_overdue(periodicity: str, latest: Optional[datetime], now: datetime) -> bool:
+    """
+    Check whether a habit's latest completion is too old to keep it active.
+    
+    Args:
+        periodicity: 'daily' or 'weekly'
+        latest: Most recent completion (None if never completed)
+        now: Reference time
+        
+    Returns:
+        bool: True if the habit is broken at the reference time
+    """
+    if latest is None:
+        return True
+    days = (now.date() - latest.date()).days
+    return days > 1 if periodicity == "daily" else days > 7
+
+
+class CompletionList(list):
+    """
+    List of completion times that always stays in ascending order.
+    
+    append/insert/extend place items with bisect; every other mutation
+    re-sorts. Each change is reported to the owning habit so it can keep
+    or drop its cached streak. The owner is referenced weakly, so a habit
+    and its list form no reference cycle and are freed as soon as the
+    habit is dropped (not at the next cyclic garbage collection).
+    """
+    
+    _on_change = None
+    
+    def __init__(self, iterable=(), on_change=None):
+        super().__init__(sorted(iterable))
+        self._on_change = weakref.WeakMethod(on_change) if on_change is not None else None
+    
+    def __reduce__(self):
+        # The owner re-attaches itself after unpickling (see Habit.__setstate__)
+        return CompletionList, (list(self),)
+    
+    def _notify(self, index: Optional[int] = None):
+        """Report a change (index of a single inserted item, else None)."""
+        callback = self._on_change() if self._on_change is not None else None
+        if callback is not None:
+            callback(index)
+    
+    def append(self, moment: datetime):
+        index = bisect.bisect_right(self, moment)
+        super().insert(index, moment)
+        self._notify(index)
+    
+    def insert(self, index: int, moment: datetime):
+        # Position is ignored to preserve the ordering
+        self.append(moment)
+    
+    def extend(self, moments):
+        moments = sorted(moments)
+        if moments and self and moments[0] < self[-1]:
+            # Backfilled items land mid-history, which needs a full rewrite
+            super().extend(moments)
+            list.sort(self)
+            self._notify()
+            return
+        # Items at or after the latest completion are queued one by one
+        for moment in moments:
+            self.append(moment)
+    
+    def __iadd__(self, moments):
+        self.extend(moments)
+        return self
+
+
+def _resorting(name: str):
+    """Wrap a list mutator so the list is re-sorted and the owner notified."""
+    method = getattr(list, name)
+    
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        list.sort(self)
+        self._notify()
+        return result
+    
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in ("__setitem__", "__delitem__", "pop", "remove", "clear", "sort", "reverse"):
+    setattr(CompletionList, _name, _resorting(_name))
 
 
 class Habit:
@@ -20,6 +145,13 @@ class Habit:
         completions (List[datetime]): List of completion times
     """
     
+    __slots__ = (
+        "id", "name", "periodicity", "created_at",
+        "_completions", "_encoded_completions", "_streak", "_streak_periodicity", "_bitmaps",
+        "_persisted", "_saved_metadata", "_pending_completions", "_history_dirty", "_history_loaded",
+        "__weakref__",
+    )
+    
     def __init__(self, name: str, periodicity: str):
         """
         Initialize a new habit.
@@ -38,7 +170,117 @@ class Habit:
         self.name = name
         self.periodicity = periodicity
         self.created_at = datetime.now()
-        self.completions: List[datetime] = []
+        self._reset_completions()
+        
+        # Cached current run and longest length, and the periodicity they are for
+        self._streak: Optional[StreakState] = StreakState()
+        self._streak_periodicity = periodicity
+        # Lazily built bitmap indexes by granularity
+        self._bitmaps: Optional[dict] = None
+        
+        # Dirty tracking: what has not yet been written to storage
+        self._persisted = False
+        self._saved_metadata: Optional[tuple] = None
+        self._pending_completions: List[datetime] = []
+        # Set by edits other than appends; the stored history is then rewritten
+        self._history_dirty = False
+        # False while the stored history has not been loaded (see mark_history_unloaded)
+        self._history_loaded = True
+    
+    def __setstate__(self, state) -> None:
+        """Restore slots after unpickling and re-attach the completion list."""
+        for name, value in state[1].items():
+            setattr(self, name, value)
+        if self._completions is not None:
+            self._completions = CompletionList(self._completions, self._completions_changed)
+    
+    def _reset_completions(self) -> None:
+        """Start with an empty completion history."""
+        self._completions = CompletionList(on_change=self._completions_changed)
+        # Epoch-second completions from storage, decoded on first access
+        self._encoded_completions: Optional[List[int]] = None
+    
+    @property
+    def completions(self) -> List[datetime]:
+        """Completion times in ascending order, decoded lazily if loaded encoded."""
+        if self._encoded_completions is not None:
+            self._completions = CompletionList(
+                map(from_epoch_seconds, self._encoded_completions), self._completions_changed
+            )
+            self._encoded_completions = None
+        return self._completions
+    
+    @completions.setter
+    def completions(self, value: List[datetime]):
+        self._completions = CompletionList(value, self._completions_changed)
+        self._encoded_completions = None
+        self._invalidate()
+        self._history_dirty = True
+    
+    def load_encoded_completions(self, seconds: List[int]) -> None:
+        """
+        Attach completions as epoch seconds without decoding them yet.
+        
+        Args:
+            seconds: Completion times from to_epoch_seconds
+        """
+        self._reset_completions()
+        self._encoded_completions = seconds
+        self._history_loaded = True
+        self._invalidate()
+    
+    def _completions_changed(self, index: Optional[int]) -> None:
+        """
+        Update the cached streak after the completion list changed.
+        
+        A new latest completion extends or starts a run in O(1); any other
+        change drops the cache for lazy recomputation. Appended items are
+        queued for the next save; any other change marks the stored history
+        for a full rewrite.
+        """
+        if index is None:
+            self._invalidate()
+            self._history_dirty = True
+        else:
+            moment = self._completions[index]
+            self._pending_completions.append(moment)
+            self._record_day(index, len(self._completions), moment.toordinal())
+    
+    def _record_day(self, index: int, count: int, day: int) -> None:
+        """Advance the cached streak and bitmaps for a day inserted at index of count completions."""
+        if self._bitmaps is not None:
+            for bitmap in self._bitmaps.values():
+                bitmap.add_day(day)
+        if self._streak is None or index != count - 1 or self._streak_periodicity != self.periodicity:
+            self._streak = None
+        else:
+            self._streak = extend_state(self.periodicity, self._streak, day)
+    
+    def _invalidate(self) -> None:
+        """Drop the cached streak and bitmaps after an arbitrary change."""
+        self._streak = None
+        self._bitmaps = None
+    
+    def completion_days(self, as_of: Optional[datetime] = None) -> List[int]:
+        """
+        Get completion days as date ordinals.
+        
+        Args:
+            as_of: Only include completions up to this time (defaults to all)
+            
+        Returns:
+            List[int]: Date ordinals, oldest first
+        """
+        completions = self.completions
+        if as_of is not None:
+            completions = completions[:bisect.bisect_right(completions, as_of)]
+        return [completion.toordinal() for completion in completions]
+    
+    def completion_count(self) -> int:
+        """Number of completions (does not force decoding)."""
+        if self._encoded_completions is not None:
+            return len(self._encoded_completions)
+        return len(self._completions)
     
     def complete(self, completion_time: Optional[datetime] = None) -> 'Habit':
         """
@@ -55,68 +297,414 @@ class Habit:
         self.completions.append(completion_time)
         return self
     
-    def get_streak(self) -> int:
+    def pending_completions(self) -> List[datetime]:
+        """
+        Get completions that have not been written to storage yet.
+        
+        Returns:
+            List[datetime]: New completions since the last save, or the
+            full history if the habit has never been persisted or its
+            history was edited other than by appending
+            
+        Raises:
+            ValueError: If the full history is needed but the stored one
+                was never loaded (it would be overwritten by a partial one)
+        """
+        if not self._persisted or self._history_dirty:
+            self._check_history_loaded()
+            return list(self.completions)
+        return list(self._pending_completions)
+    
+    def _check_history_loaded(self) -> None:
+        """Refuse a full history rewrite while the stored history is not loaded."""
+        if not self._history_loaded:
+            raise ValueError(
+                f"Habit '{self.name}' was loaded without its completions; "
+                "only appends can be saved"
+            )
+    
+    def is_persisted(self) -> bool:
+        """Check whether the habit has been saved to or loaded from storage."""
+        return self._persisted
+    
+    def is_metadata_dirty(self) -> bool:
+        """
+        Check whether name, periodicity or creation time changed since the last save.
+        
+        Returns:
+            bool: True if the habit row needs to be (re)written
+        """
+        return self._saved_metadata != self._metadata()
+    
+    def is_history_dirty(self) -> bool:
+        """
+        Check whether the completion history changed other than by appending.
+        
+        Returns:
+            bool: True if the stored completions must be rewritten in full
+        """
+        return self._history_dirty
+    
+    def mark_history_unloaded(self) -> None:
+        """
+        Record that the stored history was not loaded (called by the storage layer).
+        
+        Appends are still saved incrementally, but edits that need a full
+        rewrite are refused until load_encoded_completions attaches it.
+        """
+        self._history_loaded = False
+    
+    def mark_saved(self) -> None:
+        """Record the current state as persisted (called by the storage layer)."""
+        self._persisted = True
+        self._saved_metadata = self._metadata()
+        self._pending_completions = []
+        self._history_dirty = False
+    
+    def _metadata(self) -> tuple:
+        """Snapshot of the fields stored in the habits table."""
+        return (self.name, self.periodicity, self.created_at)
+    
+    def get_streak_runs(self, as_of: Optional[datetime] = None) -> List[StreakRun]:
+        """
+        Get every streak run in the completion history.
+        
+        The run history is built on demand in one pass over the sorted
+        completions; it is not cached (see get_streak_state).
+        
+        Args:
+            as_of: Reference time; later completions are ignored (defaults to all)
+        
+        Returns:
+            List[StreakRun]: Runs in chronological order
+        """
+        return find_runs(self.periodicity, self.completion_days(as_of))
+    
+    def get_streak_state(self, as_of: Optional[datetime] = None) -> StreakState:
+        """
+        Get the current run and the longest run length.
+        
+        Only this state is cached; complete() advances it in O(1), so
+        repeated streak queries neither rescan nor copy the history.
+        
+        Args:
+            as_of: Reference time; later completions are ignored (defaults to all)
+        
+        Returns:
+            StreakState: Current run and longest run length
+        """
+        if as_of is not None:
+            latest = self.latest_completion()
+            if latest is not None and latest > as_of:
+                return streak_state(self.periodicity, self.completion_days(as_of))
+        if self._streak is None or self._streak_periodicity != self.periodicity:
+            self._streak = streak_state(self.periodicity, self.completion_days())
+            self._streak_periodicity = self.periodicity
+        return self._streak
+    
+    def get_streak(self, as_of: Optional[datetime] = None) -> int:
         """
         Calculate the current streak length.
         
+        Args:
+            as_of: Reference time; later completions are ignored (defaults to all)
+        
         Returns:
             int: Current streak count (0 if no completions)
             
         Note:
-            - Daily habits: consecutive days
-            - Weekly habits: consecutive weeks
-            - Respects periodicity in calculation
+            - Daily habits: consecutive calendar days
+            - Weekly habits: consecutive ISO weeks (Monday to Sunday)
+            - Several completions in the same period count once
+        """
+        return self.get_streak_state(as_of).current_length
+    
+    def get_longest_streak(self, as_of: Optional[datetime] = None) -> int:
         """
-        if not self.completions:
-            return 0
+        Calculate the longest streak in the habit's history.
         
-        # Sort completions newest first
-        sorted_completions = sorted(self.completions, reverse=True)
-        streak = 1
+        Args:
+            as_of: Reference time; later completions are ignored (defaults to all)
+        
+        Returns:
+            int: Longest streak count (0 if no completions)
+        """
+        return self.get_streak_state(as_of).longest
+    
+    def get_bitmap(self, granularity: Optional[str] = None) -> CompletionBitmap:
+        """
+        Get the bitmap index of completed days or weeks.
+        
+        The bitmap is built once and kept up to date by complete().
+        
+        Args:
+            granularity: 'day' or 'week' (defaults to the habit's periodicity)
+            
+        Returns:
+            CompletionBitmap: Bitmap of completed periods (do not modify)
+        """
+        if granularity is None:
+            granularity = "day" if self.periodicity == "daily" else "week"
+        if self._bitmaps is None:
+            self._bitmaps = {}
+        bitmap = self._bitmaps.get(granularity)
+        if bitmap is None:
+            bitmap = CompletionBitmap.from_days(granularity, self.completion_days())
+            self._bitmaps[granularity] = bitmap
+        return bitmap
+    
+    def is_done_on(self, day: date) -> bool:
+        """
+        Check whether the habit was completed in the period containing a date.
         
-        for i in range(1, len(sorted_completions)):
-            current = sorted_completions[i-1]
-            previous = sorted_completions[i]
+        Args:
+            day: Date to check (its ISO week for weekly habits)
+            
+        Returns:
+            bool: True if completed in that period
+        """
+        return self.get_bitmap().contains(day)
+    
+    def latest_completion(self, as_of: Optional[datetime] = None) -> Optional[datetime]:
+        """
+        Get the most recent completion time.
+        
+        Args:
+            as_of: Only consider completions up to this time (defaults to all)
             
-            if self.periodicity == "daily":
-                # Check if consecutive days (exactly 1 day difference)
-                if (current.date() - previous.date()).days == 1:
-                    streak += 1
-                else:
-                    break
-            else:  # weekly
-                # Check if consecutive weeks (6-8 days difference)
-                days_diff = (current.date() - previous.date()).days
-                if 6 <= days_diff <= 8:
-                    streak += 1
-                else:
-                    break
-        
-        return streak
-    
-    def is_broken(self) -> bool:
+        Returns:
+            Optional[datetime]: Latest completion (None if never completed)
+        """
+        completions = self.completions
+        end = len(completions) if as_of is None else bisect.bisect_right(completions, as_of)
+        return completions[end - 1] if end else None
+    
+    def is_broken(self, as_of: Optional[datetime] = None) -> bool:
         """
         Check if the habit is currently broken.
         
+        Args:
+            as_of: Reference time (defaults to now); pass one frozen instant
+                when evaluating many habits
+        
         Returns:
             bool: True if habit is broken, False otherwise
         """
-        if not self.completions:
-            return True
-        
-        latest = max(self.completions)
-        now = datetime.now()
+        if as_of is None:
+            as_of = datetime.now()
+        return is_overdue(self.periodicity, self.latest_completion(as_of), as_of)
+    
+    def describe(self, as_of: Optional[datetime] = None) -> str:
+        """
+        One-line status of the habit at a reference time.
         
-        if self.periodicity == "daily":
-            return (now.date() - latest.date()).days > 1
-        else:  # weekly
-            return (now.date() - latest.date()).days > 7
+        Args:
+            as_of: Reference time (defaults to now)
+            
+        Returns:
+            str: Name, periodicity, streak and active/broken status
+        """
+        as_of = as_of or datetime.now()
+        status = "✅ Active" if not self.is_broken(as_of) else "❌ Broken"
+        return f"{self.name} ({self.periodicity}) - Streak: {self.get_streak(as_of)} - {status}"
     
     def __str__(self) -> str:
         """String representation of the habit."""
-        status = "✅ Active" if not self.is_broken() else "❌ Broken"
-        return f"{self.name} ({self.periodicity}) - Streak: {self.get_streak()} - {status}"
+        return self.describe()
     
     def __repr__(self) -> str:
         """Official representation."""
         return f"Habit(name='{self.name}', periodicity='{self.periodicity}', streak={self.get_streak()})"
+
+
+
+
+class CompactHabit(Habit):
+    """
+    Memory-compact habit for very large fleets.
+    
+    Completions are kept as sorted day ordinals in an ``array('i')``
+    (4 bytes each) instead of a list of datetime objects, so only the
+    calendar day of each completion is retained in memory. Streak and
+    broken checks work directly on the ordinals.
+    
+    Attributes:
+        completions (Tuple[datetime, ...]): Read-only view of completion
+            days (midnight); use complete() to add completions
+    """
+    
+    __slots__ = ("_days",)
+    
+    def _reset_completions(self) -> None:
+        """Start with an empty ordinal buffer."""
+        self._days = array("i")
+        self._completions = None
+        self._encoded_completions = None
+    
+    @property
+    def completions(self) -> Tuple[datetime, ...]:
+        """Completion days as datetimes at midnight, in ascending order (immutable)."""
+        return tuple(datetime.fromordinal(day) for day in self._days)
+    
+    @completions.setter
+    def completions(self, value: List[datetime]):
+        self._days = array("i", sorted(moment.toordinal() for moment in value))
+        self._invalidate()
+        self._history_dirty = True
+    
+    def load_encoded_completions(self, seconds: List[int]) -> None:
+        """
+        Attach completions from epoch seconds as day ordinals.
+        
+        Args:
+            seconds: Completion times from to_epoch_seconds
+        """
+        base = EPOCH.toordinal()
+        self._days = array("i", (base + ts // SECONDS_PER_DAY for ts in seconds))
+        self._history_loaded = True
+        self._invalidate()
+    
+    def completion_count(self) -> int:
+        """Number of completions."""
+        return len(self._days)
+    
+    def complete(self, completion_time: Optional[datetime] = None) -> 'CompactHabit':
+        """
+        Mark the habit as completed.
+        
+        Args:
+            completion_time: Optional specific time (defaults to now)
+        
+        Returns:
+            self: For method chaining
+        """
+        if completion_time is None:
+            completion_time = datetime.now()
+        day = completion_time.toordinal()
+        index = bisect.bisect_right(self._days, day)
+        self._days.insert(index, day)
+        self._pending_completions.append(completion_time)
+        self._record_day(index, len(self._days), day)
+        return self
+    
+    def pending_completions(self) -> List[datetime]:
+        """
+        Get completions that have not been written to storage yet.
+        
+        Only days are kept in memory, so a full history can only be
+        written if every completion was added by complete() since the
+        last save (their exact times are kept until then).
+        
+        Returns:
+            List[datetime]: New completions since the last save, or the
+            full history if the habit has never been persisted
+            
+        Raises:
+            ValueError: If the full history is needed but its times were
+                truncated to days (assigned or loaded without persisting)
+        """
+        if self._persisted and not self._history_dirty:
+            return list(self._pending_completions)
+        self._check_history_loaded()
+        if self._history_dirty or len(self._pending_completions) != len(self._days):
+            raise ValueError("Compact habits cannot save a history whose times were truncated to days")
+        return sorted(self._pending_completions)
+    
+    def completion_days(self, as_of: Optional[datetime] = None) -> array:
+        """Completion days as date ordinals, oldest first (up to as_of's day if given)."""
+        if as_of is None:
+            return self._days
+        return self._days[:bisect.bisect_right(self._days, as_of.toordinal())]
+    
+    def latest_completion(self, as_of: Optional[datetime] = None) -> Optional[datetime]:
+        """
+        Get the most recent completion day.
+        
+        Args:
+            as_of: Only consider days up to this time's day (defaults to all)
+            
+        Returns:
+            Optional[datetime]: Latest completion day at midnight (None if none)
+        """
+        days = self.completion_days(as_of)
+        return datetime.fromordinal(days[-1]) if days else None
+
+
+class HabitSummary:
+    """
+    Precomputed statistics for a habit, read without its completion history.
+    
+    Provides the same get_streak/is_broken interface as Habit, so the
+    analytics functions accept either.
+    
+    Attributes:
+        id (str): Habit identifier
+        name (str): Habit name
+        periodicity (str): 'daily' or 'weekly'
+        last_completed_at (Optional[datetime]): Most recent completion
+        current_streak (int): Streak ending at the latest completion
+        longest_streak (int): Longest streak ever recorded
+        total_completions (int): Number of completions
+    """
+    
+    def __init__(self, habit_id: str, name: str, periodicity: str,
+                 last_completed_at: Optional[datetime] = None, current_streak: int = 0,
+                 longest_streak: int = 0, total_completions: int = 0):
+        """
+        Initialize a summary from stored statistics.
+        
+        Args:
+            habit_id: Habit identifier
+            name: Habit name
+            periodicity: 'daily' or 'weekly'
+            last_completed_at: Most recent completion
+            current_streak: Streak ending at the latest completion
+            longest_streak: Longest streak ever recorded
+            total_completions: Number of completions
+        """
+        self.id = habit_id
+        self.name = name
+        self.periodicity = periodicity
+        self.last_completed_at = last_completed_at
+        self.current_streak = current_streak
+        self.longest_streak = longest_streak
+        self.total_completions = total_completions
+    
+    def _clamp_as_of(self, as_of: Optional[datetime]) -> datetime:
+        """
+        Resolve the reference time, never earlier than the latest stored completion.
+        
+        Stored statistics cannot be rewound, so a reference time before the
+        latest completion (e.g. "now" when a completion was logged ahead of
+        the clock) is evaluated at that completion instead.
+        """
+        as_of = as_of or datetime.now()
+        if self.last_completed_at is not None and as_of < self.last_completed_at:
+            return self.last_completed_at
+        return as_of
+    
+    def get_streak(self, as_of: Optional[datetime] = None) -> int:
+        """Current streak count (stored statistics; as_of is not rewound)."""
+        return self.current_streak
+    
+    def get_longest_streak(self, as_of: Optional[datetime] = None) -> int:
+        """Longest streak count (stored statistics; as_of is not rewound)."""
+        return self.longest_streak
+    
+    def is_broken(self, as_of: Optional[datetime] = None) -> bool:
+        """Check if the habit is broken at as_of (defaults to now)."""
+        return is_overdue(self.periodicity, self.last_completed_at, self._clamp_as_of(as_of))
+    
+    def describe(self, as_of: Optional[datetime] = None) -> str:
+        """One-line status matching Habit.describe."""
+        status = "✅ Active" if not self.is_broken(as_of) else "❌ Broken"
+        return f"{self.name} ({self.periodicity}) - Streak: {self.get_streak(as_of)} - {status}"
+    
+    def __str__(self) -> str:
+        """String representation matching Habit."""
+        return self.describe()
+    
+    def __repr__(self) -> str:
+        """Official representation."""
+        return (f"HabitSummary(name='{self.name}', periodicity='{self.periodicity}', "
+                f"streak={self.current_streak}, longest={self.longest_streak})")
@@ -3,126 +3,1373 @@ Database storage using SQLite for habit persistence.
 Implements CRUD operations for habits and completions.
 """
 
+import copy
+import csv
+import json
+import os
 import sqlite3
+import threading
+import zlib
+from contextlib import contextmanager
 from datetime import datetime
-from typing import List
-from .habit import Habit
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from .analytics import HISTOGRAMS, STREAK_KINDS, HabitStats, LeaderboardEntry, week_label
+from .bitmap import PERIODICITY_GRANULARITY, CompletionBitmap
+from .habit import (
+    CompactHabit, EPOCH, Habit, HabitSummary, SECONDS_PER_DAY,
+    from_epoch_seconds, to_epoch_seconds,
+)
+from .streaks import period_index
+
+# Date ordinal of epoch second 0
+EPOCH_ORDINAL = EPOCH.toordinal()
+
+# Owner of habits created without an explicit user
+DEFAULT_USER = "default"
+
+# (last_completed_at, current_streak, longest_streak, total_completions)
+EMPTY_STATS = (None, 0, 0, 0)
+
+# Cached report variants kept per user before the least recently used is evicted
+REPORT_CACHE_SIZE = 32
+
+# Habits fetched per round trip by the streaming readers
+STREAM_CHUNK_SIZE = 500
+
+# Seconds per histogram scan bucket; hours are fine enough for every kind
+SECONDS_PER_HOUR = 3600
+
+
+def _create_base_tables(cursor: sqlite3.Cursor):
+    """Migration 1: habits and completions tables."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS habits (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            periodicity TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS completions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            habit_id TEXT NOT NULL,
+            completed_at TIMESTAMP NOT NULL,
+            FOREIGN KEY (habit_id) REFERENCES habits (id)
+        )
+    """)
+
+
+def _add_lookup_indexes(cursor: sqlite3.Cursor):
+    """Migration 2: covering index for per-habit completions and habit name index."""
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_completions_habit_time
+        ON completions (habit_id, completed_at)
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_habits_name ON habits (name)")
+
+
+def _column_type(cursor: sqlite3.Cursor, table: str, column: str) -> Optional[str]:
+    """Declared type of a column (None if the column does not exist)."""
+    for row in cursor.execute(f"PRAGMA table_info({table})").fetchall():
+        if row[1] == column:
+            return row[2]
+    return None
+
+
+def _encode_completion_times(cursor: sqlite3.Cursor):
+    """Migration 3: store completions as integer epoch seconds instead of text."""
+    if _column_type(cursor, "completions", "completed_at") == "INTEGER":
+        return
+    cursor.execute("DROP TABLE IF EXISTS completions_new")
+    cursor.execute("""
+        CREATE TABLE completions_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            habit_id TEXT NOT NULL,
+            completed_at INTEGER NOT NULL,
+            FOREIGN KEY (habit_id) REFERENCES habits (id)
+        )
+    """)
+    # strftime('%s') reads the stored text as UTC, matching the naive
+    # EPOCH arithmetic in to_epoch_seconds
+    cursor.execute("""
+        INSERT INTO completions_new (id, habit_id, completed_at)
+        SELECT id, habit_id,
+               CASE WHEN typeof(completed_at) = 'integer' THEN completed_at
+                    ELSE CAST(strftime('%s', completed_at) AS INTEGER) END
+        FROM completions
+    """)
+    cursor.execute("DROP TABLE completions")
+    cursor.execute("ALTER TABLE completions_new RENAME TO completions")
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_completions_habit_time
+        ON completions (habit_id, completed_at)
+    """)
+
+
+def _create_stats_table(cursor: sqlite3.Cursor):
+    """Migration 4: per-habit streak summary, backfilled from existing completions."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS habit_stats (
+            habit_id TEXT PRIMARY KEY,
+            last_completed_at INTEGER,
+            current_streak INTEGER NOT NULL DEFAULT 0,
+            longest_streak INTEGER NOT NULL DEFAULT 0,
+            total_completions INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (habit_id) REFERENCES habits (id)
+        )
+    """)
+    habit_ids = [row[0] for row in cursor.execute("SELECT id FROM habits").fetchall()]
+    for habit_id in habit_ids:
+        _rebuild_stats(cursor, habit_id)
+
+
+def _add_user_column(cursor: sqlite3.Cursor):
+    """Migration 5: owner column on habits; existing habits belong to DEFAULT_USER."""
+    if _column_type(cursor, "habits", "user_id") is None:
+        cursor.execute(
+            f"ALTER TABLE habits ADD COLUMN user_id TEXT NOT NULL DEFAULT '{DEFAULT_USER}'"
+        )
+    cursor.execute("DROP INDEX IF EXISTS idx_habits_name")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_habits_user_name ON habits (user_id, name)")
+
+
+def _create_bitmap_table(cursor: sqlite3.Cursor):
+    """
+    Migration 6: per-habit day/week completion bitmaps.
+    
+    Streaks switched to period bucketing at the same time, so the
+    statistics are rebuilt along with the new bitmaps.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS completion_bitmaps (
+            habit_id TEXT NOT NULL,
+            granularity TEXT NOT NULL,
+            base INTEGER NOT NULL,
+            bits BLOB NOT NULL,
+            PRIMARY KEY (habit_id, granularity),
+            FOREIGN KEY (habit_id) REFERENCES habits (id)
+        )
+    """)
+    habit_ids = [row[0] for row in cursor.execute("SELECT id FROM habits").fetchall()]
+    for habit_id in habit_ids:
+        _rebuild_stats(cursor, habit_id)
+
+
+def _create_report_cache(cursor: sqlite3.Cursor):
+    """
+    Migration 7: data version counter and cached report results.
+    
+    Every write bumps data_version; a cached report is only served while
+    the version it was computed at is still current.
+    """
+    cursor.execute("CREATE TABLE IF NOT EXISTS data_version (version INTEGER NOT NULL)")
+    cursor.execute(
+        "INSERT INTO data_version (version) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM data_version)"
+    )
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS report_cache (
+            user_id TEXT NOT NULL,
+            report_key TEXT NOT NULL,
+            data_version INTEGER NOT NULL,
+            payload TEXT NOT NULL,
+            last_used INTEGER NOT NULL,
+            PRIMARY KEY (user_id, report_key)
+        )
+    """)
+
+
+def _add_streak_indexes(cursor: sqlite3.Cursor):
+    """
+    Migration 8: descending streak indexes and a stats row for every habit.
+    
+    The indexes let top_streaks walk habit_stats from the highest streak
+    down; only ties, ordered by habit rowid, still go through a small
+    sort. Habits created by import_records without completions had no
+    stats row and were missing from the leaderboard; they get one here.
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stats_current ON habit_stats (current_streak DESC)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_stats_longest ON habit_stats (longest_streak DESC)")
+    habit_ids = [row[0] for row in cursor.execute("""
+        SELECT id FROM habits
+        WHERE id NOT IN (SELECT habit_id FROM habit_stats)
+        ORDER BY rowid
+    """).fetchall()]
+    for habit_id in habit_ids:
+        _rebuild_stats(cursor, habit_id)
+
+
+def _prune_bitmaps(cursor: sqlite3.Cursor):
+    """Migration 9: keep only the bitmap matching each habit's periodicity."""
+    cursor.execute("""
+        DELETE FROM completion_bitmaps
+        WHERE granularity != (
+            SELECT CASE h.periodicity WHEN 'weekly' THEN 'week' ELSE 'day' END
+            FROM habits h WHERE h.id = completion_bitmaps.habit_id
+        )
+    """)
+
+
+# Ordered schema migrations; MIGRATIONS[n] upgrades version n to n + 1
+MIGRATIONS = [
+    _create_base_tables,
+    _add_lookup_indexes,
+    _encode_completion_times,
+    _create_stats_table,
+    _add_user_column,
+    _create_bitmap_table,
+    _create_report_cache,
+    _add_streak_indexes,
+    _prune_bitmaps,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def _parse_completion_time(value) -> int:
+    """
+    Convert an imported completion time to epoch seconds.
+    
+    Args:
+        value: Naive ISO 8601 string or integer epoch seconds
+        
+    Returns:
+        int: Epoch seconds as stored in the completions table
+        
+    Raises:
+        ValueError: If the value is not a naive ISO time or integer epoch
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if not isinstance(value, str):
+        raise ValueError(f"Unsupported completion time: {value!r}")
+    if value.isdigit():
+        return int(value)
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is not None:
+        raise ValueError(f"Completion time must not carry a UTC offset: {value!r}")
+    return to_epoch_seconds(moment)
+
+
+def _fold_completions(periodicity: str, stats: tuple, seconds: Iterable[int]) -> tuple:
+    """
+    Advance streak statistics over completions in ascending time order.
+    
+    Args:
+        periodicity: 'daily' or 'weekly'
+        stats: Statistics tuple before these completions (see EMPTY_STATS)
+        seconds: Epoch-second completions, none earlier than stats' last one
+        
+    Returns:
+        tuple: Updated statistics tuple
+    """
+    last, current, longest, total = stats
+    for ts in seconds:
+        period = period_index(periodicity, EPOCH_ORDINAL + ts // SECONDS_PER_DAY)
+        gap = None if last is None else period - period_index(
+            periodicity, EPOCH_ORDINAL + last // SECONDS_PER_DAY)
+        if gap == 1:
+            current += 1
+        elif gap != 0:
+            current = 1
+        longest = max(longest, current)
+        last = ts
+        total += 1
+    return (last, current, longest, total)
+
+
+def _write_stats(cursor: sqlite3.Cursor, habit_id: str, stats: tuple):
+    """Upsert a habit_stats row."""
+    cursor.execute("""
+        INSERT INTO habit_stats
+            (habit_id, last_completed_at, current_streak, longest_streak, total_completions)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (habit_id) DO UPDATE SET
+            last_completed_at = excluded.last_completed_at,
+            current_streak = excluded.current_streak,
+            longest_streak = excluded.longest_streak,
+            total_completions = excluded.total_completions
+    """, (habit_id, *stats))
+
+
+def _rebuild_stats(cursor: sqlite3.Cursor, habit_id: str):
+    """Recompute a habit's statistics and bitmaps from its full completion history."""
+    row = cursor.execute("SELECT periodicity FROM habits WHERE id = ?", (habit_id,)).fetchone()
+    if row is None:
+        return
+    seconds = [r[0] for r in cursor.execute(
+        "SELECT completed_at FROM completions WHERE habit_id = ? ORDER BY completed_at",
+        (habit_id,)
+    ).fetchall()]
+    _write_stats(cursor, habit_id, _fold_completions(row[0], EMPTY_STATS, seconds))
+    if _has_bitmap_table(cursor):
+        cursor.execute("DELETE FROM completion_bitmaps WHERE habit_id = ?", (habit_id,))
+        _update_bitmaps(cursor, habit_id, row[0], seconds)
+
+
+def _has_bitmap_table(cursor: sqlite3.Cursor) -> bool:
+    """Whether migration 6 has run (older migrations rebuild stats before it)."""
+    return cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'completion_bitmaps'"
+    ).fetchone() is not None
+
+
+def _update_bitmaps(cursor: sqlite3.Cursor, habit_id: str, periodicity: str, seconds: List[int]):
+    """
+    Set the bits for new completions in a habit's stored bitmap.
+    
+    Only the bitmap matching the habit's periodicity is kept; a
+    periodicity change rebuilds it through _rebuild_stats.
+    
+    Args:
+        cursor: Cursor inside the write transaction
+        habit_id: Habit the completions belong to
+        periodicity: The habit's periodicity
+        seconds: Epoch seconds of the completions (any order)
+    """
+    if not seconds:
+        return
+    granularity = PERIODICITY_GRANULARITY[periodicity]
+    row = cursor.execute(
+        "SELECT base, bits FROM completion_bitmaps WHERE habit_id = ? AND granularity = ?",
+        (habit_id, granularity)
+    ).fetchone()
+    bitmap = CompletionBitmap.from_bytes(granularity, *row) if row else CompletionBitmap(granularity)
+    for ts in seconds:
+        bitmap.add_day(EPOCH_ORDINAL + ts // SECONDS_PER_DAY)
+    cursor.execute("""
+        INSERT INTO completion_bitmaps (habit_id, granularity, base, bits)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT (habit_id, granularity) DO UPDATE SET
+            base = excluded.base, bits = excluded.bits
+    """, (habit_id, granularity, bitmap.base, bitmap.to_bytes()))
+
+
+def _update_stats(cursor: sqlite3.Cursor, habit_id: str, new_seconds: List[int],
+                  stale: Optional[Set[str]] = None):
+    """
+    Incrementally fold newly inserted completions into a habit's statistics.
+    
+    Falls back to a full rebuild when there is no stats row yet or a
+    completion was backfilled before the latest recorded one.
+    
+    Args:
+        cursor: Cursor inside the write transaction
+        habit_id: Habit the completions belong to
+        new_seconds: Epoch seconds of the inserted completions
+        stale: If given, habits needing a rebuild are added to it instead
+            and rebuilt by the caller once all completions are inserted
+    """
+    if stale is not None and habit_id in stale:
+        return
+    row = cursor.execute("""
+        SELECT h.periodicity, s.last_completed_at, s.current_streak,
+               s.longest_streak, s.total_completions
+        FROM habits h LEFT JOIN habit_stats s ON s.habit_id = h.id
+        WHERE h.id = ?
+    """, (habit_id,)).fetchone()
+    if row is None:
+        return
+    
+    periodicity, stats = row[0], row[1:]
+    new_seconds = sorted(new_seconds)
+    if stats[3] is None or (stats[0] is not None and new_seconds[0] < stats[0]):
+        if stale is not None:
+            stale.add(habit_id)
+        else:
+            _rebuild_stats(cursor, habit_id)
+    else:
+        _write_stats(cursor, habit_id, _fold_completions(periodicity, stats, new_seconds))
+        _update_bitmaps(cursor, habit_id, periodicity, new_seconds)
+
+
+def _bump_data_version(cursor: sqlite3.Cursor):
+    """Invalidate cached reports; called by every write to habits or completions."""
+    cursor.execute("UPDATE data_version SET version = version + 1")
+
+
+def _check_owned(cursor: sqlite3.Cursor, user_id: str, habit_ids: Iterable[str]):
+    """
+    Make sure every habit exists and belongs to the user before writing to it.
+    
+    Args:
+        cursor: Cursor inside the write transaction
+        user_id: Owner the write is scoped to
+        habit_ids: Habits about to be written
+        
+    Raises:
+        ValueError: If a habit is unknown or owned by another user
+    """
+    for habit_id in set(habit_ids):
+        row = cursor.execute(
+            "SELECT 1 FROM habits WHERE id = ? AND user_id = ?", (habit_id, user_id)
+        ).fetchone()
+        if row is None:
+            raise ValueError(f"Unknown habit: {habit_id}")
+
+
+def _insert_completions(cursor: sqlite3.Cursor, rows: List[tuple],
+                        stale: Optional[Set[str]] = None):
+    """
+    Insert (habit_id, epoch_seconds) completion rows and update statistics.
+    
+    Args:
+        cursor: Cursor inside the write transaction
+        rows: Completion rows to insert
+        stale: Collects habits whose rebuild is deferred (see _update_stats)
+    """
+    if not rows:
+        return
+    cursor.executemany("INSERT INTO completions (habit_id, completed_at) VALUES (?, ?)", rows)
+    by_habit: Dict[str, List[int]] = {}
+    for habit_id, seconds in rows:
+        by_habit.setdefault(habit_id, []).append(seconds)
+    for habit_id, seconds in by_habit.items():
+        _update_stats(cursor, habit_id, seconds, stale)
 
 
 class HabitDatabase:
     """
     SQLite database manager for habit storage.
     
+    In pooled mode the database is switched to WAL journaling and every
+    thread gets its own connection, so readers run concurrently with a
+    single writer. Writes from threads of the same instance are
+    serialized by a lock; other processes wait on busy_timeout.
+    
+    Every instance is scoped to one user: reads only see that user's
+    habits and new habits are stored under it.
+    
     Attributes:
-        conn (sqlite3.Connection): Database connection
+        db_path (str): Path to the SQLite database file
+        user_id (str): Owner whose habits this instance reads and writes
+        pooled (bool): Whether per-thread connections are used
+        conn (sqlite3.Connection): Connection for the calling thread
     """
     
-    def __init__(self, db_path: str = "habits.db"):
+    def __init__(self, db_path: str = "habits.db", pooled: bool = False,
+                 busy_timeout: int = 5000, user_id: str = DEFAULT_USER):
         """
         Initialize database connection.
         
         Args:
             db_path: Path to SQLite database file
+            pooled: Enable WAL mode with per-thread connections
+            busy_timeout: Milliseconds to wait on a locked database (pooled mode)
+            user_id: Owner to scope reads and writes to
+            
+        Raises:
+            ValueError: If pooled mode is requested for an in-memory database
         """
-        self.conn = sqlite3.connect(db_path)
+        if pooled and db_path == ":memory:":
+            raise ValueError("Pooled mode requires a database file")
+        
+        self.db_path = db_path
+        self.user_id = user_id
+        self.pooled = pooled
+        self.busy_timeout = busy_timeout
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+        self._pool: List[sqlite3.Connection] = []
+        self._pool_lock = threading.Lock()
+        self._conn = None if pooled else sqlite3.connect(db_path)
         self.create_tables()
     
+    def for_user(self, user_id: str) -> 'HabitDatabase':
+        """
+        Get a view of the same database scoped to another user.
+        
+        The view shares connections and locks with this instance; closing
+        either closes both.
+        
+        Args:
+            user_id: Owner to scope the view to
+            
+        Returns:
+            HabitDatabase: User-scoped view
+        """
+        view = copy.copy(self)
+        view.user_id = user_id
+        return view
+    
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Connection for the calling thread (shared when not pooled)."""
+        if not self.pooled:
+            return self._conn
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+        return conn
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open and register a new pooled connection with WAL pragmas."""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout)}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        with self._pool_lock:
+            self._pool.append(conn)
+        return conn
+    
+    @contextmanager
+    def _transaction(self):
+        """
+        Run a write transaction on the calling thread's connection.
+        
+        Yields:
+            sqlite3.Connection: Connection inside an open transaction
+        """
+        conn = self.conn
+        with self._write_lock:
+            with conn:
+                yield conn
+    
     def create_tables(self):
-        """Create database tables if they don't exist."""
-        cursor = self.conn.cursor()
+        """Create database tables if they don't exist and apply pending migrations."""
+        self.migrate()
+    
+    def schema_version(self) -> int:
+        """
+        Get the schema version of the open database.
         
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS habits (
-                id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                periodicity TEXT NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
+        Returns:
+            int: Value of PRAGMA user_version (0 for unversioned files)
+        """
+        return self.conn.execute("PRAGMA user_version").fetchone()[0]
+    
+    def migrate(self, target: Optional[int] = None):
+        """
+        Upgrade the schema in place to the target version.
         
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS completions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                habit_id TEXT NOT NULL,
-                completed_at TIMESTAMP NOT NULL,
-                FOREIGN KEY (habit_id) REFERENCES habits (id)
-            )
-        """)
+        Each migration runs in its own BEGIN IMMEDIATE transaction together
+        with the PRAGMA user_version bump, so an interrupted upgrade never
+        leaves a half-applied step behind. The version is re-read after the
+        write lock is taken, so processes opening the same file at once
+        apply every step exactly once.
         
-        self.conn.commit()
+        Args:
+            target: Version to migrate to (defaults to SCHEMA_VERSION)
+        """
+        target = SCHEMA_VERSION if target is None else target
+        if self.schema_version() >= target:
+            return
+        
+        while True:
+            with self._write_lock:
+                cursor = self.conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                try:
+                    version = cursor.execute("PRAGMA user_version").fetchone()[0]
+                    if version >= target:
+                        self.conn.rollback()
+                        return
+                    MIGRATIONS[version](cursor)
+                    cursor.execute(f"PRAGMA user_version = {version + 1}")
+                except Exception:
+                    self.conn.rollback()
+                    raise
+                self.conn.commit()
     
     def save_habit(self, habit: Habit):
         """
         Save or update a habit in the database.
         
+        Only changed metadata and completions added since the last save are
+        written, all inside a single transaction, and the habit_stats row is
+        advanced incrementally. A habit that has never been persisted, or whose
+        history was edited other than by appending, has its full completion
+        history rewritten and its statistics rebuilt.
+        
         Args:
             habit: Habit object to save
         """
-        cursor = self.conn.cursor()
+        # New objects and history rewrites replace every stored completion
+        rewrite = not habit.is_persisted() or habit.is_history_dirty()
+        # ...and they and metadata edits (e.g. periodicity) recompute statistics
+        rebuild = rewrite or habit.is_metadata_dirty()
+        rows = [(habit.id, to_epoch_seconds(completion)) for completion in habit.pending_completions()]
         
-        # Save or update habit
-        cursor.execute("""
-            INSERT OR REPLACE INTO habits (id, name, periodicity, created_at)
-            VALUES (?, ?, ?, ?)
-        """, (habit.id, habit.name, habit.periodicity, habit.created_at))
+        with self._transaction() as conn:
+            cursor = conn.cursor()
+            
+            if rebuild:
+                cursor.execute("""
+                    INSERT INTO habits (id, name, periodicity, created_at, user_id)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET
+                        name = excluded.name,
+                        periodicity = excluded.periodicity,
+                        created_at = excluded.created_at
+                    WHERE habits.user_id = excluded.user_id
+                """, (habit.id, habit.name, habit.periodicity, habit.created_at, self.user_id))
+            
+            if rebuild or rows:
+                # Another user's habit with the same id is left untouched
+                _check_owned(cursor, self.user_id, [habit.id])
+            
+            if rewrite:
+                # This object owns the full history
+                cursor.execute("DELETE FROM completions WHERE habit_id = ?", (habit.id,))
+            
+            if rebuild:
+                cursor.executemany(
+                    "INSERT INTO completions (habit_id, completed_at) VALUES (?, ?)", rows
+                )
+                _rebuild_stats(cursor, habit.id)
+            else:
+                _insert_completions(cursor, rows)
+            
+            if rebuild or rows:
+                _bump_data_version(cursor)
         
-        # Remove old completions and save new ones
-        cursor.execute("DELETE FROM completions WHERE habit_id = ?", (habit.id,))
+        habit.mark_saved()
+    
+    def add_completion(self, habit_id: str, completed_at: Optional[datetime] = None):
+        """
+        Append a single completion without touching the rest of the history.
         
-        for completion in habit.completions:
-            cursor.execute(
-                "INSERT INTO completions (habit_id, completed_at) VALUES (?, ?)",
-                (habit.id, completion)
-            )
+        Args:
+            habit_id: ID of the completed habit
+            completed_at: Completion time (defaults to now)
+            
+        Raises:
+            ValueError: If the habit is unknown or owned by another user
+        """
+        if completed_at is None:
+            completed_at = datetime.now()
+        self.add_completions([(habit_id, completed_at)])
+    
+    def add_completions(self, completions: Iterable[Tuple[str, datetime]]):
+        """
+        Append several completions in one transaction.
         
-        self.conn.commit()
+        Args:
+            completions: (habit_id, completed_at) pairs
+            
+        Raises:
+            ValueError: If a habit is unknown or owned by another user
+                (nothing is written)
+        """
+        rows = [(habit_id, to_epoch_seconds(completed_at)) for habit_id, completed_at in completions]
+        with self._transaction() as conn:
+            cursor = conn.cursor()
+            _check_owned(cursor, self.user_id, (habit_id for habit_id, _ in rows))
+            _insert_completions(cursor, rows)
+            if rows:
+                _bump_data_version(cursor)
     
-    def load_all_habits(self) -> List[Habit]:
+    def load_all_habits(self, compact: bool = False) -> List[Habit]:
         """
         Load all habits from the database.
         
+        Uses two set-based queries (habits, then all completions ordered by
+        habit) and groups completion rows in a single pass. Completion
+        times stay as epoch seconds until a habit's completions are read.
+        
+        Args:
+            compact: Build CompactHabit objects (day ordinals, no __dict__)
+        
         Returns:
             List[Habit]: List of all habits with their completions
         """
         cursor = self.conn.cursor()
         
-        cursor.execute("SELECT id, name, periodicity, created_at FROM habits")
-        habits_data = cursor.fetchall()
+        cursor.execute(
+            "SELECT id, name, periodicity, created_at FROM habits WHERE user_id = ? ORDER BY rowid",
+            (self.user_id,)
+        )
+        habit_class = CompactHabit if compact else Habit
+        habits = [self._habit_from_row(row, habit_class) for row in cursor.fetchall()]
+        by_id = {habit.id: habit for habit in habits}
+        
+        cursor.execute("""
+            SELECT c.habit_id, c.completed_at
+            FROM completions c JOIN habits h ON h.id = c.habit_id
+            WHERE h.user_id = ?
+            ORDER BY c.habit_id, c.completed_at
+        """, (self.user_id,))
+        current_id, current_list = None, None
+        encoded = {}
+        for habit_id, completed_at in cursor:
+            if habit_id != current_id:
+                current_id = habit_id
+                current_list = encoded.setdefault(habit_id, []) if habit_id in by_id else None
+            if current_list is not None:
+                current_list.append(completed_at)
+        
+        for habit_id, seconds in encoded.items():
+            by_id[habit_id].load_encoded_completions(seconds)
+        
+        for habit in habits:
+            habit.mark_saved()
+        
+        return habits
+    
+    def iter_habits(self, chunk_size: int = STREAM_CHUNK_SIZE, compact: bool = False) -> Iterator[Habit]:
+        """
+        Yield habits lazily, chunk_size at a time.
+        
+        Habit rows are read from one open cursor with fetchmany; each chunk's
+        completions are fetched with a single query, so memory stays bounded
+        by the chunk rather than the database. Habits come in table (rowid)
+        order, the same as load_all_habits.
         
-        habits = []
-        for habit_id, name, periodicity, created_at in habits_data:
-            # Create habit object
-            habit = Habit(name, periodicity)
-            habit.id = habit_id
-            habit.created_at = datetime.fromisoformat(created_at) if created_at else datetime.now()
+        Args:
+            chunk_size: Habits per chunk
+            compact: Build CompactHabit objects (day ordinals, no __dict__)
             
-            # Load completions
-            cursor.execute(
-                "SELECT completed_at FROM completions WHERE habit_id = ? ORDER BY completed_at",
-                (habit_id,)
+        Yields:
+            Habit: Habits with their completions, marked as saved
+        """
+        habit_class = CompactHabit if compact else Habit
+        habit_cursor = self.conn.execute(
+            "SELECT id, name, periodicity, created_at FROM habits WHERE user_id = ? ORDER BY rowid",
+            (self.user_id,)
+        )
+        while True:
+            rows = habit_cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            habits = [self._habit_from_row(row, habit_class) for row in rows]
+            by_id = {habit.id: habit for habit in habits}
+            
+            encoded: Dict[str, List[int]] = {}
+            completion_cursor = self.conn.execute(
+                f"SELECT habit_id, completed_at FROM completions "
+                f"WHERE habit_id IN ({', '.join('?' * len(by_id))}) ORDER BY habit_id, completed_at",
+                list(by_id)
             )
-            completions = cursor.fetchall()
-            habit.completions = [
-                datetime.fromisoformat(comp[0]) if isinstance(comp[0], str) else comp[0]
-                for comp in completions
-            ]
+            for habit_id, completed_at in completion_cursor:
+                encoded.setdefault(habit_id, []).append(completed_at)
             
-            habits.append(habit)
+            for habit in habits:
+                if habit.id in encoded:
+                    habit.load_encoded_completions(encoded[habit.id])
+                habit.mark_saved()
+                yield habit
+    
+    def bulk_import(self, path: str, file_format: Optional[str] = None,
+                    batch_size: int = 10_000,
+                    progress: Optional[Callable[[int], None]] = None) -> Dict[str, int]:
+        """
+        Import habits and completions from a CSV or JSONL file.
         
-        return habits
+        Each record describes one completion with the fields ``name``,
+        ``periodicity`` and ``completed_at`` (naive local ISO time or integer epoch seconds;
+        empty to create the habit only). The file is streamed, so memory
+        stays bounded by the number of distinct habits.
+        
+        Args:
+            path: File to read
+            file_format: 'csv' or 'jsonl' (inferred from the extension if omitted)
+            batch_size: Completions per executemany batch
+            progress: Called with the running completion count after each batch
+            
+        Returns:
+            Dict[str, int]: Number of habits created and completions imported
+            
+        Raises:
+            ValueError: If the format is unknown or a record is invalid
+        """
+        if file_format is None:
+            file_format = os.path.splitext(path)[1].lstrip(".").lower()
+        if file_format not in ("csv", "jsonl"):
+            raise ValueError("Import format must be 'csv' or 'jsonl'")
+        
+        with open(path, newline="", encoding="utf-8") as handle:
+            if file_format == "csv":
+                records = csv.DictReader(handle)
+            else:
+                records = (json.loads(line) for line in handle if line.strip())
+            return self.import_records(records, batch_size, progress)
+    
+    def import_records(self, records: Iterable[Dict[str, Any]], batch_size: int = 10_000,
+                       progress: Optional[Callable[[int], None]] = None) -> Dict[str, int]:
+        """
+        Import completion records in batches inside a single transaction.
+        
+        Habits are matched by name; unknown names are created with the
+        record's periodicity. Any invalid record rolls back the whole import.
+        Habits that receive backfilled completions have their statistics
+        rebuilt once, after the last batch, rather than once per batch.
+        
+        Args:
+            records: Iterable of dicts (see bulk_import for the fields)
+            batch_size: Completions per executemany batch
+            progress: Called with the running completion count after each batch
+            
+        Returns:
+            Dict[str, int]: Number of habits created and completions imported
+        """
+        habit_ids: Dict[str, str] = {}
+        created = imported = 0
+        batch = []
+        stale: Set[str] = set()
+        
+        with self._transaction() as conn:
+            cursor = conn.cursor()
+            
+            for number, record in enumerate(records, 1):
+                name = record.get("name")
+                if not name:
+                    raise ValueError(f"Record {number} has no habit name: {record!r}")
+                habit_id = habit_ids.get(name)
+                if habit_id is None:
+                    row = cursor.execute(
+                        "SELECT id FROM habits WHERE user_id = ? AND name = ? LIMIT 1",
+                        (self.user_id, name)
+                    ).fetchone()
+                    if row is None:
+                        habit = Habit(name, record.get("periodicity"))
+                        cursor.execute(
+                            "INSERT INTO habits (id, name, periodicity, created_at, user_id) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            (habit.id, habit.name, habit.periodicity, habit.created_at, self.user_id)
+                        )
+                        habit_id = habit.id
+                        _write_stats(cursor, habit_id, EMPTY_STATS)
+                        created += 1
+                    else:
+                        habit_id = row[0]
+                    habit_ids[name] = habit_id
+                
+                completed_at = record.get("completed_at")
+                if completed_at in (None, ""):
+                    continue
+                try:
+                    seconds = _parse_completion_time(completed_at)
+                except ValueError as error:
+                    raise ValueError(f"Record {number}: {error}") from error
+                batch.append((habit_id, seconds))
+                
+                if len(batch) >= batch_size:
+                    _insert_completions(cursor, batch, stale)
+                    imported += len(batch)
+                    batch = []
+                    if progress is not None:
+                        progress(imported)
+            
+            if batch:
+                _insert_completions(cursor, batch, stale)
+                imported += len(batch)
+                if progress is not None:
+                    progress(imported)
+            
+            for habit_id in stale:
+                _rebuild_stats(cursor, habit_id)
+            
+            if created or imported:
+                _bump_data_version(cursor)
+        
+        return {"habits_created": created, "completions_imported": imported}
+    
+    def load_habit_summaries(self) -> List[HabitSummary]:
+        """
+        Load precomputed statistics for all habits without their histories.
+        
+        Returns:
+            List[HabitSummary]: One summary per habit, in table order
+        """
+        return list(self.iter_habit_summaries())
+    
+    def iter_habit_summaries(self, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[HabitSummary]:
+        """
+        Yield precomputed habit statistics lazily from an open cursor.
+        
+        Args:
+            chunk_size: Rows fetched per round trip
+            
+        Yields:
+            HabitSummary: One summary per habit, in table order
+        """
+        cursor = self.conn.execute("""
+            SELECT h.id, h.name, h.periodicity, s.last_completed_at,
+                   COALESCE(s.current_streak, 0), COALESCE(s.longest_streak, 0),
+                   COALESCE(s.total_completions, 0)
+            FROM habits h LEFT JOIN habit_stats s ON s.habit_id = h.id
+            WHERE h.user_id = ?
+            ORDER BY h.rowid
+        """, (self.user_id,))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            for habit_id, name, periodicity, last, current, longest, total in rows:
+                yield HabitSummary(habit_id, name, periodicity,
+                                   from_epoch_seconds(last) if last is not None else None,
+                                   current, longest, total)
+    
+    def load_streak_stats(self, as_of: Optional[datetime] = None, clamp: bool = False) -> List[HabitStats]:
+        """
+        Compute every habit's streaks and broken status inside SQLite.
+        
+        Completions up to as_of are bucketed into periods (day ordinals, or
+        Monday-based weeks for weekly habits) and split into runs with the
+        gaps-and-islands pattern: within a habit, period minus its row
+        number is constant along a run of consecutive periods. Only one
+        summary row per habit leaves the database.
+        
+        Args:
+            as_of: Reference time (defaults to now); later completions are ignored
+            clamp: Evaluate like the stored summaries of live reports instead:
+                completions after as_of still count, and a habit completed
+                after as_of is judged at its latest completion
+            
+        Returns:
+            List[HabitStats]: One row per habit, in insertion order, with the
+            same values as analytics.collect_habit_stats over the loaded habits
+            (or over HabitDatabase.load_habit_summaries if clamp is set)
+        """
+        as_of = as_of or datetime.now()
+        cursor = self.conn.execute("""
+            WITH scoped AS (
+                SELECT c.habit_id, c.completed_at,
+                       :epoch + c.completed_at / 86400 AS day,
+                       h.periodicity
+                FROM completions c JOIN habits h ON h.id = c.habit_id
+                WHERE h.user_id = :user AND (:cutoff IS NULL OR c.completed_at <= :cutoff)
+            ),
+            periods AS (
+                SELECT DISTINCT habit_id,
+                       CASE periodicity WHEN 'daily' THEN day ELSE (day - 1) / 7 END AS period
+                FROM scoped
+            ),
+            runs AS (
+                SELECT habit_id, COUNT(*) AS length, MAX(period) AS last_period
+                FROM (
+                    SELECT habit_id, period,
+                           period - ROW_NUMBER() OVER (PARTITION BY habit_id ORDER BY period) AS island
+                    FROM periods
+                )
+                GROUP BY habit_id, island
+            ),
+            streaks AS (
+                SELECT habit_id, MAX(length) AS longest,
+                       MAX(CASE WHEN recency = 1 THEN length END) AS current
+                FROM (
+                    SELECT habit_id, length,
+                           ROW_NUMBER() OVER (PARTITION BY habit_id ORDER BY last_period DESC) AS recency
+                    FROM runs
+                )
+                GROUP BY habit_id
+            ),
+            latest AS (
+                SELECT habit_id, MAX(day) AS last_day FROM scoped GROUP BY habit_id
+            )
+            SELECT h.name, h.periodicity,
+                   COALESCE(s.current, 0), COALESCE(s.longest, 0),
+                   l.last_day IS NULL
+                       OR MAX(:today, l.last_day) - l.last_day > CASE h.periodicity WHEN 'daily' THEN 1 ELSE 7 END
+            FROM habits h
+            LEFT JOIN streaks s ON s.habit_id = h.id
+            LEFT JOIN latest l ON l.habit_id = h.id
+            WHERE h.user_id = :user
+            ORDER BY h.rowid
+        """, {"epoch": EPOCH_ORDINAL, "user": self.user_id,
+              "cutoff": None if clamp else to_epoch_seconds(as_of), "today": as_of.toordinal()})
+        return [HabitStats(name, periodicity, current, longest, bool(broken))
+                for name, periodicity, current, longest, broken in cursor]
+    
+    def completion_histograms(self, kinds: Iterable[str] = HISTOGRAMS, as_of: Optional[datetime] = None,
+                              names: Optional[Iterable[str]] = None) -> Dict[str, Dict[Any, int]]:
+        """
+        Count completions per weekday, hour and ISO week with one SQL GROUP BY.
+        
+        Completions are grouped by hour since the epoch inside SQLite (read
+        from the (habit_id, completed_at) covering index); every histogram
+        is then folded from those few rows, so all kinds cost one scan.
+        
+        Args:
+            kinds: Keys of analytics.HISTOGRAMS ('weekday', 'hour', 'week')
+            as_of: Ignore completions after this time (defaults to now)
+            names: Only count habits with these names (defaults to all)
+            
+        Returns:
+            Dict[str, Dict[Any, int]]: Per kind, counts by bucket in bucket
+            order, keyed like analytics.completion_histograms
+            
+        Raises:
+            ValueError: If a kind is not a known histogram
+        """
+        kinds = list(kinds)
+        unknown = set(kinds) - set(HISTOGRAMS)
+        if unknown:
+            raise ValueError(f"Unknown histogram: {', '.join(sorted(unknown))}")
+        
+        as_of = as_of or datetime.now()
+        params: List[Any] = [SECONDS_PER_HOUR, self.user_id, to_epoch_seconds(as_of)]
+        name_filter = ""
+        if names is not None:
+            names = list(names)
+            name_filter = f"AND h.name IN ({', '.join('?' * len(names))})"
+            params.extend(names)
+        
+        cursor = self.conn.execute(f"""
+            SELECT c.completed_at / ? AS hour, COUNT(*)
+            FROM completions c JOIN habits h ON h.id = c.habit_id
+            WHERE h.user_id = ? AND c.completed_at <= ? {name_filter}
+            GROUP BY hour
+        """, params)
+        
+        weekdays: Dict[int, int] = {}
+        hours: Dict[int, int] = {}
+        weeks: Dict[int, int] = {}
+        for hour, count in cursor:
+            # 1970-01-01 was a Thursday: +3 makes Monday weekday 0
+            day = hour // 24
+            weekdays[(day + 3) % 7] = weekdays.get((day + 3) % 7, 0) + count
+            hours[hour % 24] = hours.get(hour % 24, 0) + count
+            weeks[(day + 3) // 7] = weeks.get((day + 3) // 7, 0) + count
+        
+        histograms = {
+            "weekday": dict(sorted(weekdays.items())),
+            "hour": dict(sorted(hours.items())),
+            # Week 0 starts on Monday 1969-12-29
+            "week": {week_label(EPOCH_ORDINAL - 3 + 7 * week): count for week, count in sorted(weeks.items())},
+        }
+        return {kind: histograms[kind] for kind in kinds}
+    
+    def completion_histogram(self, kind: str, as_of: Optional[datetime] = None,
+                             names: Optional[Iterable[str]] = None) -> Dict[Any, int]:
+        """
+        Count completions for a single histogram kind (see completion_histograms).
+        
+        Raises:
+            ValueError: If kind is not a known histogram
+        """
+        return self.completion_histograms([kind], as_of, names)[kind]
+    
+    def top_streaks(self, k: int = 10, by: str = "current") -> List[LeaderboardEntry]:
+        """
+        Read the k highest streaks from the precomputed statistics.
+        
+        The descending streak index is walked in order (CROSS JOIN keeps
+        habit_stats as the outer loop), so no completions are read. The
+        index does not order ties by habit rowid: SQLite sorts each group
+        of equal streaks in a temporary B-tree, and the scan stops once k
+        rows of this user are out and their tie group is complete. Ties
+        thus keep table order like analytics.top_streaks over load_all_habits.
+        
+        Args:
+            k: Number of entries to return
+            by: 'current' or 'longest' streak
+            
+        Returns:
+            List[LeaderboardEntry]: Up to k entries, highest streak first
+            
+        Raises:
+            ValueError: If by is not a known streak kind
+        """
+        if by not in STREAK_KINDS:
+            raise ValueError(f"Unknown streak kind: {by}")
+        
+        column = f"{by}_streak"
+        cursor = self.conn.execute(f"""
+            SELECT h.name, h.periodicity, s.{column}
+            FROM habit_stats s CROSS JOIN habits h ON h.id = s.habit_id
+            WHERE h.user_id = ?
+            ORDER BY s.{column} DESC, h.rowid
+            LIMIT ?
+        """, (self.user_id, k))
+        return [LeaderboardEntry(*row) for row in cursor]
+    
+    def load_bitmap(self, habit_id: str) -> Optional[CompletionBitmap]:
+        """
+        Load a habit's stored completion bitmap without reading its completions.
+        
+        Args:
+            habit_id: ID of the habit
+            
+        Returns:
+            Optional[CompletionBitmap]: Bitmap of completed days (daily habits)
+            or weeks (weekly habits); None if the habit does not exist
+        """
+        row = self.conn.execute("""
+            SELECT h.periodicity, b.base, b.bits FROM habits h
+            LEFT JOIN completion_bitmaps b ON b.habit_id = h.id
+                AND b.granularity = CASE h.periodicity WHEN 'weekly' THEN 'week' ELSE 'day' END
+            WHERE h.id = ? AND h.user_id = ?
+        """, (habit_id, self.user_id)).fetchone()
+        if row is None:
+            return None
+        granularity = PERIODICITY_GRANULARITY[row[0]]
+        if row[1] is None:
+            return CompletionBitmap(granularity)
+        return CompletionBitmap.from_bytes(granularity, row[1], row[2])
+    
+    def iter_completion_bitmaps(self, chunk_size: int = STREAM_CHUNK_SIZE
+                                ) -> Iterator[Tuple[str, datetime, CompletionBitmap]]:
+        """
+        Yield every habit's stored bitmap lazily, without reading completions.
+        
+        Live completion rates are answered from these (see
+        analytics.bitmap_prefix) instead of loading full histories.
+        
+        Args:
+            chunk_size: Rows fetched per round trip
+            
+        Yields:
+            Tuple[str, datetime, CompletionBitmap]: (periodicity, created_at,
+            bitmap) per habit, in table order
+        """
+        cursor = self.conn.execute("""
+            SELECT h.periodicity, h.created_at, b.base, b.bits
+            FROM habits h LEFT JOIN completion_bitmaps b ON b.habit_id = h.id
+                AND b.granularity = CASE h.periodicity WHEN 'weekly' THEN 'week' ELSE 'day' END
+            WHERE h.user_id = ?
+            ORDER BY h.rowid
+        """, (self.user_id,))
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                return
+            for periodicity, created_at, base, bits in rows:
+                granularity = PERIODICITY_GRANULARITY[periodicity]
+                bitmap = (CompletionBitmap.from_bytes(granularity, base, bits) if base is not None
+                          else CompletionBitmap(granularity))
+                yield (periodicity,
+                       datetime.fromisoformat(created_at) if created_at else datetime.now(),
+                       bitmap)
+    
+    def get_habit_by_id(self, habit_id: str, load_completions: bool = True) -> Optional[Habit]:
+        """
+        Load a single habit by its primary key.
+        
+        Args:
+            habit_id: ID of the habit
+            load_completions: Also load the completion history (without it
+                only appends to the habit can be saved)
+            
+        Returns:
+            Optional[Habit]: The habit, or None if it does not exist
+        """
+        row = self.conn.execute(
+            "SELECT id, name, periodicity, created_at FROM habits WHERE id = ? AND user_id = ?",
+            (habit_id, self.user_id)
+        ).fetchone()
+        return self._load_single(row, load_completions)
+    
+    def get_habit_by_name(self, name: str, load_completions: bool = True) -> Optional[Habit]:
+        """
+        Load a single habit by name using the habits name index.
+        
+        Args:
+            name: Name of the habit
+            load_completions: Also load the completion history (without it
+                only appends to the habit can be saved)
+            
+        Returns:
+            Optional[Habit]: The first habit with that name, or None
+        """
+        row = self.conn.execute(
+            "SELECT id, name, periodicity, created_at FROM habits "
+            "WHERE user_id = ? AND name = ? LIMIT 1",
+            (self.user_id, name)
+        ).fetchone()
+        return self._load_single(row, load_completions)
+    
+    def _load_single(self, row, load_completions: bool) -> Optional[Habit]:
+        """Build a habit from a row and optionally attach its completions."""
+        if row is None:
+            return None
+        habit = self._habit_from_row(row)
+        if load_completions:
+            cursor = self.conn.execute(
+                "SELECT completed_at FROM completions WHERE habit_id = ? ORDER BY completed_at",
+                (habit.id,)
+            )
+            habit.load_encoded_completions([comp[0] for comp in cursor])
+        else:
+            habit.mark_history_unloaded()
+        habit.mark_saved()
+        return habit
+    
+    @staticmethod
+    def _habit_from_row(row, habit_class: type = Habit) -> Habit:
+        """
+        Build a Habit (without completions) from a habits table row.
+        
+        Args:
+            row: (id, name, periodicity, created_at) tuple
+            habit_class: Habit or CompactHabit
+            
+        Returns:
+            Habit: Habit object with stored id and creation time
+        """
+        habit_id, name, periodicity, created_at = row
+        habit = habit_class(name, periodicity)
+        habit.id = habit_id
+        habit.created_at = datetime.fromisoformat(created_at) if created_at else datetime.now()
+        return habit
     
     def delete_habit(self, habit_id: str):
         """
         Delete a habit and its completions.
         
         Args:
-            habit_id: ID of the habit to delete
+            habit_id: ID of the habit to delete (ignored if owned by another user)
         """
-        cursor = self.conn.cursor()
-        cursor.execute("DELETE FROM completions WHERE habit_id = ?", (habit_id,))
-        cursor.execute("DELETE FROM habits WHERE id = ?", (habit_id,))
-        self.conn.commit()
+        with self._transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM habits WHERE id = ? AND user_id = ?", (habit_id, self.user_id))
+            if cursor.rowcount:
+                cursor.execute("DELETE FROM completions WHERE habit_id = ?", (habit_id,))
+                cursor.execute("DELETE FROM habit_stats WHERE habit_id = ?", (habit_id,))
+                cursor.execute("DELETE FROM completion_bitmaps WHERE habit_id = ?", (habit_id,))
+                _bump_data_version(cursor)
+    
+    def data_version(self) -> int:
+        """
+        Get the write counter of the database.
+        
+        Returns:
+            int: Number of writes to habits or completions so far
+        """
+        return self.conn.execute("SELECT version FROM data_version").fetchone()[0]
+    
+    def get_cached_report(self, key: str) -> Optional[Any]:
+        """
+        Look up a cached report computed at the current data version.
+        
+        A hit marks the entry as most recently used.
+        
+        Args:
+            key: Report variant (command and options)
+            
+        Returns:
+            Optional[Any]: The cached JSON payload, or None on a miss
+        """
+        with self._transaction() as conn:
+            row = conn.execute("""
+                SELECT payload FROM report_cache
+                WHERE user_id = ? AND report_key = ?
+                  AND data_version = (SELECT version FROM data_version)
+            """, (self.user_id, key)).fetchone()
+            if row is None:
+                return None
+            conn.execute("""
+                UPDATE report_cache
+                SET last_used = (SELECT COALESCE(MAX(last_used), 0) + 1 FROM report_cache)
+                WHERE user_id = ? AND report_key = ?
+            """, (self.user_id, key))
+        return json.loads(row[0])
+    
+    def put_cached_report(self, key: str, payload: Any, capacity: int = REPORT_CACHE_SIZE):
+        """
+        Store a report at the current data version.
+        
+        Entries from older data versions are dropped, and only the
+        capacity most recently used variants of this user are kept.
+        
+        Args:
+            key: Report variant (command and options)
+            payload: JSON-serializable report
+            capacity: Maximum cached variants per user
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM report_cache WHERE data_version <> (SELECT version FROM data_version)"
+            )
+            conn.execute("""
+                INSERT OR REPLACE INTO report_cache
+                    (user_id, report_key, data_version, payload, last_used)
+                VALUES (?, ?, (SELECT version FROM data_version), ?,
+                        (SELECT COALESCE(MAX(last_used), 0) + 1 FROM report_cache))
+            """, (self.user_id, key, json.dumps(payload)))
+            conn.execute("""
+                DELETE FROM report_cache
+                WHERE user_id = ? AND report_key NOT IN (
+                    SELECT report_key FROM report_cache WHERE user_id = ?
+                    ORDER BY last_used DESC LIMIT ?
+                )
+            """, (self.user_id, self.user_id, capacity))
+    
+    def close(self):
+        """Close database connection (all pooled connections in pooled mode)."""
+        if not self.pooled:
+            self._conn.close()
+            return
+        with self._pool_lock:
+            for conn in self._pool:
+                conn.close()
+            self._pool.clear()
+        self._local = threading.local()
+
+
+class ShardedHabitDatabase:
+    """
+    Router that spreads users over several SQLite files.
+    
+    A user always maps to the same shard via a stable CRC32 hash of the
+    user id, so write contention and file size are split across files.
+    Shards are opened lazily and shared by all users hashed to them.
+    
+    Attributes:
+        directory (str): Folder holding the shard files
+        shard_count (int): Number of shards (must not change once data exists)
+    """
+    
+    def __init__(self, directory: str = "habit_shards", shard_count: int = 8, **options: Any):
+        """
+        Initialize the router.
+        
+        Args:
+            directory: Folder for the shard files (created if missing)
+            shard_count: Number of shards
+            **options: Extra keyword arguments for each shard's HabitDatabase
+            
+        Raises:
+            ValueError: If shard_count is not positive
+        """
+        if shard_count < 1:
+            raise ValueError("Shard count must be at least 1")
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.shard_count = shard_count
+        self._options = options
+        self._shards: Dict[int, HabitDatabase] = {}
+        self._lock = threading.Lock()
+    
+    def shard_index(self, user_id: str) -> int:
+        """
+        Get the shard a user is stored in.
+        
+        Args:
+            user_id: User identifier
+            
+        Returns:
+            int: Shard number in range(shard_count)
+        """
+        return zlib.crc32(user_id.encode("utf-8")) % self.shard_count
+    
+    def shard_path(self, index: int) -> str:
+        """Path of the SQLite file for a shard number."""
+        return os.path.join(self.directory, f"habits_{index:03d}.db")
+    
+    def for_user(self, user_id: str) -> HabitDatabase:
+        """
+        Get a database scoped to a user on that user's shard.
+        
+        Args:
+            user_id: User identifier
+            
+        Returns:
+            HabitDatabase: User-scoped view of the shard
+        """
+        index = self.shard_index(user_id)
+        with self._lock:
+            shard = self._shards.get(index)
+            if shard is None:
+                shard = HabitDatabase(self.shard_path(index), **self._options)
+                self._shards[index] = shard
+        return shard.for_user(user_id)
     
     def close(self):
-        """Close database connection."""
-        self.conn.close()
+        """Close every opened shard."""
+        with self._lock:
+            for shard in self._shards.values():
+                shard.close()
+            self._shards.clear()
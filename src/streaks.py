@@ -0,0 +1,154 @@
+"""
+Run-length streak engine.
+Splits a sorted completion history into streak runs in a single pass.
+
+Completions are bucketed into periods (calendar days for daily habits,
+Monday-based ISO weeks for weekly habits). A streak is a run of
+consecutive periods; several completions in one period count once.
+"""
+
+from datetime import date
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+
+class StreakRun(NamedTuple):
+    """
+    A maximal run of consecutive completions.
+    
+    Attributes:
+        start (date): Day of the first completion in the run
+        end (date): Day of the last completion in the run
+        length (int): Number of consecutive periods in the run
+    """
+    start: date
+    end: date
+    length: int
+
+
+def period_index(periodicity: str, day: int) -> int:
+    """
+    Get the period containing a day.
+    
+    Args:
+        periodicity: 'daily' or 'weekly'
+        day: Date ordinal
+        
+    Returns:
+        int: The ordinal itself (daily) or the ISO week number counted
+        from 0001-01-01, which is a Monday (weekly)
+    """
+    return day if periodicity == "daily" else (day - 1) // 7
+
+
+def iter_runs(periodicity: str, days: Iterable[int]) -> Iterator[StreakRun]:
+    """
+    Yield streak runs in one pass over ascending day ordinals.
+    
+    Args:
+        periodicity: 'daily' or 'weekly'
+        days: Completion days as date ordinals, oldest first
+        
+    Yields:
+        StreakRun: Runs in chronological order (the last one is the
+        current streak)
+    """
+    start = previous = None
+    length = 0
+    
+    for day in days:
+        period = period_index(periodicity, day)
+        if previous is not None:
+            gap = period - period_index(periodicity, previous)
+            if gap == 0:
+                previous = day
+                continue
+            if gap == 1:
+                length += 1
+                previous = day
+                continue
+            yield StreakRun(date.fromordinal(start), date.fromordinal(previous), length)
+        start, previous, length = day, day, 1
+    
+    if previous is not None:
+        yield StreakRun(date.fromordinal(start), date.fromordinal(previous), length)
+
+
+def find_runs(periodicity: str, days: Iterable[int]) -> List[StreakRun]:
+    """
+    Compute all streak runs in one pass over ascending day ordinals.
+    
+    Args:
+        periodicity: 'daily' or 'weekly'
+        days: Completion days as date ordinals, oldest first
+        
+    Returns:
+        List[StreakRun]: Runs in chronological order (the last one is the
+        current streak)
+        
+    Example:
+        >>> find_runs("daily", [738000, 738001, 738005])
+        [StreakRun(start=..., end=..., length=2), StreakRun(..., length=1)]
+    """
+    return list(iter_runs(periodicity, days))
+
+
+class StreakState(NamedTuple):
+    """
+    The part of a run history that streak queries need.
+    
+    Attributes:
+        current (Optional[StreakRun]): Latest run (None without completions)
+        longest (int): Length of the longest run
+    """
+    current: Optional[StreakRun] = None
+    longest: int = 0
+    
+    @property
+    def current_length(self) -> int:
+        """Length of the latest run (0 without completions)."""
+        return self.current.length if self.current is not None else 0
+
+
+def streak_state(periodicity: str, days: Iterable[int]) -> StreakState:
+    """
+    Fold ascending day ordinals into the current run and longest length.
+    
+    Runs are consumed as they are found, so no run history is kept.
+    
+    Args:
+        periodicity: 'daily' or 'weekly'
+        days: Completion days as date ordinals, oldest first
+        
+    Returns:
+        StreakState: Current run and longest run length
+    """
+    current, longest = None, 0
+    for current in iter_runs(periodicity, days):
+        longest = max(longest, current.length)
+    return StreakState(current, longest)
+
+
+def extend_state(periodicity: str, state: StreakState, day: int) -> StreakState:
+    """
+    Advance a streak state for a completion on or after the latest one (O(1)).
+    
+    Args:
+        periodicity: 'daily' or 'weekly'
+        state: State from streak_state
+        day: Date ordinal of the new latest completion
+        
+    Returns:
+        StreakState: Updated state
+    """
+    last = state.current
+    gap = period_index(periodicity, day) - period_index(periodicity, last.end.toordinal()) if last else None
+    if gap in (0, 1):
+        current = StreakRun(last.start, date.fromordinal(day), last.length + gap)
+    else:
+        current = StreakRun(date.fromordinal(day), date.fromordinal(day), 1)
+    return StreakState(current, max(state.longest, current.length))
+
+
+def longest_run(runs: Iterable[StreakRun]) -> int:
+    """Length of the longest run (0 when there are none)."""
+    return max((run.length for run in runs), default=0)
@@ -5,7 +5,7 @@ Covers all functional programming functions.
 
 import pytest
 from datetime import datetime, timedelta
-from src.habit import Habit
+from src.habit import CompactHabit, Habit, HabitSummary
 from src.analytics import *
 
 
@@ -57,6 +57,16 @@ class TestAnalytics:
         streak = get_longest_streak_for_habit(self.habits, "Read 30 Minutes")
         assert streak == 3
         
+        # Longest streak, not the current one
+        today = datetime.now()
+        habit = Habit("Lapsed", "daily")
+        for i in range(3, 10):
+            habit.completions.append(today - timedelta(days=i))
+        habit.complete(today)
+        assert get_longest_streak_for_habit([habit], "Lapsed") == 7
+        assert analyze_performance([habit])["longest_streak"] == 7
+        assert get_longest_streak_all(self.habits + [habit]) == 7
+        
         # Test non-existent habit
         streak = get_longest_streak_for_habit(self.habits, "Non-Existent")
         assert streak == 0
@@ -82,6 +92,137 @@ class TestAnalytics:
         assert "completion_rate" in stats
         assert "average_streak" in stats
     
+    def test_analytics_as_of(self):
+        """Test that reports are reproducible for a frozen reference time."""
+        as_of = datetime.now() - timedelta(days=2)
+        stats = analyze_performance(self.habits, as_of)
+        
+        # Completions of the last two days are ignored
+        assert stats["longest_streak"] == 3
+        assert get_longest_streak_all(self.habits, as_of) == 3
+        assert get_longest_streak_for_habit(self.habits, "Read 30 Minutes", as_of) == 1
+        assert analyze_performance(self.habits, as_of) == stats
+    
+    def test_aggregate_performance_single_pass(self):
+        """Test that the fused fold matches the individual metric functions."""
+        as_of = datetime.now()
+        totals = aggregate_performance(self.habits, as_of)
+        
+        assert totals.total == 5
+        assert totals.daily == len(get_daily_habits(self.habits))
+        assert totals.weekly == len(get_weekly_habits(self.habits))
+        assert totals.longest_streak == get_longest_streak_all(self.habits, as_of)
+        assert totals.streak_sum == sum(h.get_streak(as_of) for h in self.habits)
+        assert totals.broken == 2
+        assert aggregate_performance([]) == PerformanceTotals()
+        assert format_totals(PerformanceTotals()) == {"error": "No habits available"}
+    
+    def test_collect_habit_stats_and_index(self):
+        """Test per-habit rows and the name index used by the report."""
+        as_of = datetime.now()
+        rows = collect_habit_stats(self.habits, as_of)
+        index = index_by_name(rows)
+        
+        assert [row.name for row in rows] == get_habit_names(self.habits)
+        assert index["Morning Exercise"].current_streak == 5
+        assert index["Weekly Planning"].longest_streak == 4
+        assert index["Meditation"].broken
+        assert aggregate_stats(rows) == aggregate_performance(self.habits, as_of)
+        
+        # Duplicate names resolve like get_longest_streak_for_habit
+        duplicate = Habit("Morning Exercise", "daily")
+        index = index_by_name(collect_habit_stats(self.habits + [duplicate], as_of))
+        assert index["Morning Exercise"].longest_streak == 5
+    
+    def test_parallel_matches_serial(self):
+        """Test that the process-pool path merges to the serial result."""
+        as_of = datetime.now()
+        habits = self.habits * 7
+        rows, totals = collect_habit_stats_parallel(habits, as_of, workers=2)
+        
+        assert rows == collect_habit_stats(habits, as_of)
+        assert totals == aggregate_performance(habits, as_of)
+        assert analyze_performance(habits, as_of, workers=2) == analyze_performance(habits, as_of)
+        assert merge_totals(totals, PerformanceTotals()) == totals
+        
+        # Summaries carry no history and are sent to the workers unpacked
+        summaries = [HabitSummary(str(i), h.name, h.periodicity, h.latest_completion(),
+                                  h.get_streak(), h.get_longest_streak(), h.completion_count())
+                     for i, h in enumerate(habits)]
+        assert collect_habit_stats_parallel(summaries, as_of, workers=2)[1] == totals
+    
+    def test_completion_rates(self):
+        """Test rolling-window rates answered from prefix sums."""
+        as_of = datetime(2024, 1, 31, 20)
+        habit = Habit("Journal", "daily")
+        habit.created_at = datetime(2024, 1, 1)
+        for day in (1, 2, 3, 25, 29, 30, 31):
+            habit.complete(datetime(2024, 1, day, 8))
+        weekly = Habit("Review", "weekly")
+        weekly.created_at = datetime(2024, 1, 1)
+        weekly.complete(datetime(2024, 1, 29, 8))
+        
+        prefix = completion_prefix(habit, as_of)
+        assert prefix.completed(prefix.base, prefix.base + 30) == 7
+        assert window_counts(prefix, *window_bounds("7d", as_of)) == (4, 7)
+        assert window_counts(completion_prefix(weekly, as_of), *window_bounds("month", as_of)) == (1, 5)
+        
+        rates = completion_rates([habit], ["7d", "30d", "week", "month"], as_of)
+        assert rates["7d"] == pytest.approx(4 / 7 * 100)
+        assert rates["30d"] == pytest.approx(6 / 30 * 100)
+        assert rates["week"] == pytest.approx(100.0)
+        assert rates["month"] == pytest.approx(7 / 31 * 100)
+        
+        # Periods before the habit existed are not expected
+        assert completion_rates([habit], ["90d"], as_of)["90d"] == pytest.approx(7 / 31 * 100)
+        assert completion_rates([habit, weekly], ["week"], as_of)["week"] == pytest.approx(100.0)
+    
+    def test_lazy_variants_consume_iterables(self):
+        """Test that the iterator variants work on one-shot generators."""
+        as_of = datetime.now()
+        rows = list(iter_habit_stats((h for h in self.habits), as_of))
+        assert rows == collect_habit_stats(self.habits, as_of)
+        
+        pairs = list(iter_with_totals(iter(rows)))
+        assert [row for row, _ in pairs] == rows
+        assert pairs[-1][1] == aggregate_performance((h for h in self.habits), as_of)
+        assert [t.total for _, t in pairs] == [1, 2, 3, 4, 5]
+        
+        assert [h.name for h in iter_by_periodicity(iter(self.habits), "weekly")] == \
+            ["Weekly Planning", "Family Dinner"]
+        assert get_longest_streak_all(h for h in self.habits) == 5
+        assert get_longest_streak_all(iter([])) == 0
+    
+    def test_top_streaks(self):
+        """Test bounded-heap ranking against a full sort."""
+        top = top_streaks(self.habits, 2)
+        assert [(e.name, e.streak) for e in top] == [("Morning Exercise", 5), ("Weekly Planning", 4)]
+        
+        ranked = sorted(self.habits, key=lambda h: h.get_longest_streak(), reverse=True)
+        assert [e.name for e in top_streaks(iter(self.habits), 10, by="longest")] == [h.name for h in ranked]
+        assert top_streaks(self.habits, 1, as_of=datetime.now() - timedelta(days=2))[0].streak == 3
+        assert top_streaks([], 3) == []
+        
+        with pytest.raises(ValueError):
+            top_streaks(self.habits, 3, by="total")
+    
+    def test_numpy_backend_matches_python(self):
+        """Test that the vectorized backend returns the same report."""
+        pytest.importorskip("numpy")
+        import random
+        
+        rng = random.Random(42)
+        as_of = datetime(2024, 6, 30, 12)
+        habits = list(self.habits)
+        for i in range(200):
+            habit = (Habit if i % 2 else CompactHabit)(f"Random {i}", rng.choice(["daily", "weekly"]))
+            for _ in range(rng.randint(0, 40)):
+                habit.complete(as_of - timedelta(days=rng.randint(-5, 60), hours=rng.randint(0, 23)))
+            habits.append(habit)
+        
+        expected = analyze_performance(habits, as_of)
+        assert analyze_performance(habits, as_of, backend="numpy") == expected
+    
     def test_get_all_habits(self):
         """Test get_all_habits returns copy."""
         habits_copy = get_all_habits(self.habits)
@@ -5,7 +5,9 @@ Covers habit creation, completion, and streak calculation.
 
 import pytest
 from datetime import datetime, timedelta
-from src.habit import Habit
+from src.habit import CompactHabit, Habit, to_epoch_seconds, from_epoch_seconds
+from src.bitmap import CompletionBitmap
+from src.streaks import StreakRun, StreakState, find_runs, streak_state
 
 
 class TestHabit:
@@ -112,6 +114,204 @@ class TestHabit:
         assert "Habit" in representation
         assert "Test" in representation
         assert "weekly" in representation
+    
+    def test_encoded_completions_decode_lazily(self):
+        """Test epoch-second completions round-trip and decode on access."""
+        moment = datetime(2024, 1, 15, 18, 30, 5)
+        assert from_epoch_seconds(to_epoch_seconds(moment)) == moment
+        
+        habit = Habit("Stretch", "daily")
+        habit.load_encoded_completions([to_epoch_seconds(moment)])
+        assert habit.completion_count() == 1
+        assert habit.completions == [moment]
+    
+    def test_completions_stay_sorted(self):
+        """Test that completions are kept in ascending order on insert."""
+        habit = Habit("Journal", "daily")
+        today = datetime(2024, 6, 10, 9)
+        for days in (0, 3, 1, 2):
+            habit.completions.append(today - timedelta(days=days))
+        habit.complete(today - timedelta(days=5))
+        
+        assert habit.completions == sorted(habit.completions)
+        assert habit.latest_completion() == today
+        
+        habit.completions[0] = today + timedelta(days=1)
+        assert habit.completions == sorted(habit.completions)
+        assert habit.latest_completion() == today + timedelta(days=1)
+    
+    def test_streak_cache_updates_incrementally(self):
+        """Test the cached streak across appends, backfills and edits."""
+        habit = Habit("Run", "daily")
+        start = datetime(2024, 6, 1, 7)
+        for days in (0, 1, 3):
+            habit.complete(start + timedelta(days=days))
+        assert habit.get_streak() == 1
+        
+        habit.complete(start + timedelta(days=4))
+        assert habit._streak.current.length == 2  # updated without a rescan
+        assert habit.get_streak_state() is habit.get_streak_state()  # read without copying
+        
+        # Backfilling the gap invalidates and recomputes
+        habit.complete(start + timedelta(days=2))
+        assert habit._streak is None
+        assert habit.get_streak() == 5
+        
+        # Jun 1-2 and Jun 3-5 fall into consecutive ISO weeks
+        habit.periodicity = "weekly"
+        assert habit.get_streak() == 2
+    
+    def test_habit_has_no_instance_dict(self):
+        """Test that habits use __slots__ instead of a per-instance dict."""
+        assert not hasattr(Habit("Slots", "daily"), "__dict__")
+        assert not hasattr(CompactHabit("Slots", "daily"), "__dict__")
+    
+    def test_habit_is_freed_without_garbage_collection(self):
+        """Test that a habit and its completion list form no reference cycle."""
+        import gc
+        import pickle
+        import weakref
+        
+        habit = Habit("Cycle", "daily").complete(datetime(2024, 1, 1))
+        habit.get_streak()
+        ref = weakref.ref(habit)
+        gc.disable()
+        try:
+            del habit
+            assert ref() is None
+        finally:
+            gc.enable()
+        
+        # Unpickled habits keep tracking completions
+        copy = pickle.loads(pickle.dumps(Habit("Copy", "daily").complete(datetime(2024, 1, 1))))
+        copy.complete(datetime(2024, 1, 2))
+        assert copy.get_streak() == 2
+        assert len(copy.pending_completions()) == 2
+    
+    def test_compact_habit_matches_habit(self):
+        """Test that the compact representation gives the same results."""
+        today = datetime.now()
+        for periodicity, step in (("daily", timedelta(days=1)), ("weekly", timedelta(weeks=1))):
+            habit = Habit("Regular", periodicity)
+            compact = CompactHabit("Compact", periodicity)
+            for i in (6, 5, 3, 2, 1, 0):
+                habit.complete(today - i * step)
+                compact.complete(today - i * step)
+            assert compact.get_streak() == habit.get_streak() == 4
+            assert compact.is_broken() == habit.is_broken() is False
+            assert compact.completion_count() == 6
+            assert compact.latest_completion() == datetime.combine(today.date(), datetime.min.time())
+        
+        compact = CompactHabit("Old", "daily")
+        assert compact.is_broken()
+        compact.complete(today - timedelta(days=3))
+        assert compact.is_broken()
+        
+        compact.load_encoded_completions([to_epoch_seconds(today - timedelta(days=i)) for i in (1, 0)])
+        assert compact.get_streak() == 2
+    
+    def test_compact_habit_rejects_lossy_writes(self):
+        """Test that compact completions are immutable and never saved truncated."""
+        moment = datetime(2024, 5, 1, 18, 30)
+        compact = CompactHabit("Compact", "daily").complete(moment)
+        with pytest.raises(AttributeError):
+            compact.completions.append(moment)
+        
+        # Exact times of completions added by complete() are kept until saved
+        assert compact.pending_completions() == [moment]
+        
+        compact.completions = [moment]
+        with pytest.raises(ValueError):
+            compact.pending_completions()
+        
+        loaded = CompactHabit("Loaded", "daily")
+        loaded.load_encoded_completions([to_epoch_seconds(moment)])
+        with pytest.raises(ValueError):
+            loaded.pending_completions()
+    
+    def test_streak_runs_and_longest_streak(self):
+        """Test run history, current and longest streak in one pass."""
+        habit = Habit("Run", "daily")
+        start = datetime(2024, 6, 1, 7)
+        for days in (0, 1, 2, 3, 6, 7, 10):
+            habit.complete(start + timedelta(days=days))
+        
+        runs = habit.get_streak_runs()
+        assert [run.length for run in runs] == [4, 2, 1]
+        assert runs[0] == StreakRun(start.date(), (start + timedelta(days=3)).date(), 4)
+        assert habit.get_streak() == 1
+        assert habit.get_longest_streak() == 4
+        assert habit.get_streak_state() == StreakState(runs[-1], 4)
+        assert streak_state("daily", []) == StreakState()
+        
+        compact = CompactHabit("Run", "daily")
+        compact.completions = habit.completions
+        assert compact.get_streak_runs() == runs
+        
+        assert find_runs("weekly", []) == []
+        # Same-day completions collapse instead of breaking the streak
+        assert [r.length for r in find_runs("daily", [700000, 700001, 700001, 700002])] == [3]
+        assert [r.length for r in find_runs("weekly", [700000, 700007, 700013, 700030])] == [3, 1]
+    
+    def test_bitmap_index_follows_completions(self):
+        """Test O(1) period lookups through the cached bitmap."""
+        habit = Habit("Plan", "weekly")
+        monday = datetime(2024, 6, 3, 9)
+        habit.complete(monday)
+        habit.complete(monday + timedelta(days=2))  # same ISO week
+        
+        assert habit.is_done_on((monday + timedelta(days=6)).date())
+        assert not habit.is_done_on((monday + timedelta(days=7)).date())
+        assert len(habit.get_bitmap()) == 1
+        assert len(habit.get_bitmap("day")) == 2
+        
+        # Completions added later are reflected in the cached bitmap
+        habit.complete(monday + timedelta(weeks=1))
+        assert habit.is_done_on((monday + timedelta(days=8)).date())
+        assert habit.get_bitmap().current_streak() == habit.get_streak() == 2
+    
+    def test_as_of_reference_time(self):
+        """Test evaluating streaks and broken status at a fixed instant."""
+        start = datetime(2024, 6, 1, 8)
+        for habit in (Habit("Run", "daily"), CompactHabit("Run", "daily")):
+            for days in (0, 1, 2, 5):
+                habit.complete(start + timedelta(days=days))
+            
+            as_of = start + timedelta(days=2, hours=1)
+            assert habit.get_streak(as_of) == 3
+            assert habit.get_longest_streak(as_of) == 3
+            assert not habit.is_broken(as_of)
+            assert habit.is_broken(start + timedelta(days=4))
+            assert habit.get_streak(start - timedelta(days=1)) == 0
+            assert habit.get_streak() == 1
+            assert "Streak: 3" in habit.describe(as_of)
+
+
+class TestCompletionBitmap:
+    """Test cases for the completion bitmap index."""
+    
+    def test_membership_counts_and_streaks(self):
+        """Test bit operations for lookups, ranges and streaks."""
+        start = datetime(2024, 1, 1).toordinal()
+        days = [start + d for d in (0, 1, 2, 3, 7, 8, 8, 12)]
+        bitmap = CompletionBitmap.from_days("day", reversed(days))
+        
+        assert len(bitmap) == 7
+        assert bitmap.contains(start + 8)
+        assert not bitmap.contains(start + 5)
+        assert not bitmap.contains(start - 1)
+        assert bitmap.count_between(start + 2, start + 8) == 4
+        assert bitmap.count_between(start - 10, start - 1) == 0
+        assert bitmap.current_streak() == 1
+        assert bitmap.longest_streak() == 4
+        assert bitmap.latest_period() == start + 12
+        
+        restored = CompletionBitmap.from_bytes("day", bitmap.base, bitmap.to_bytes())
+        assert restored.bits == bitmap.bits
+        
+        assert CompletionBitmap("week").current_streak() == 0
+        with pytest.raises(ValueError):
+            CompletionBitmap("month")
 
 
 if __name__ == "__main__":
@@ -83,6 +83,179 @@ class TestIntegration:
         assert cli is not None
         assert hasattr(cli, 'commands')
     
+    def test_cli_complete_by_name(self):
+        """Test the complete command appends a check-in for the named habit."""
+        from click.testing import CliRunner
+        from src.cli import cli
+        
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            runner.invoke(cli, ["create", "--name", "Exercise", "--periodicity", "daily"])
+            result = runner.invoke(cli, ["complete", "--name", "Exercise"])
+            assert "Completed: Exercise" in result.output
+            
+            result = runner.invoke(cli, ["complete", "--name", "Missing"])
+            assert "not found" in result.output
+            
+            db = HabitDatabase()
+            habit = db.get_habit_by_name("Exercise")
+            db.close()
+            assert len(habit.completions) == 1
+    
+    def test_cli_user_option_uses_separate_storage(self):
+        """Test that --user keeps habits apart from the default database."""
+        from click.testing import CliRunner
+        from src.cli import cli
+        
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            runner.invoke(cli, ["--user", "alice", "create", "--name", "Swim", "--periodicity", "daily"])
+            assert "Swim" in runner.invoke(cli, ["--user", "alice", "list"]).output
+            assert "Swim" not in runner.invoke(cli, ["--user", "bob", "list"]).output
+            assert "Swim" not in runner.invoke(cli, ["list"]).output
+    
+    def test_cli_as_of_option(self):
+        """Test evaluating list and analytics at a past instant."""
+        from click.testing import CliRunner
+        from src.cli import cli
+        from datetime import datetime
+        
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            db = HabitDatabase()
+            habit = Habit("Stretch", "daily")
+            for day in range(1, 4):
+                habit.complete(datetime(2024, 1, day, 9))
+            db.save_habit(habit)
+            db.close()
+            
+            result = runner.invoke(cli, ["list", "--as-of", "2024-01-02 12:00:00"])
+            assert "Streak: 2 - ✅ Active" in result.output
+            
+            result = runner.invoke(cli, ["analytics", "--as-of", "2024-01-10"])
+            assert "Broken habits: 1" in result.output
+            assert "Longest 3" in result.output
+            
+            for option in ("--workers=2", "--sql"):
+                rerun = runner.invoke(cli, ["analytics", "--as-of", "2024-01-10", option, "--no-cache"])
+                assert rerun.output == result.output
+            
+            result = runner.invoke(cli, ["analytics", "--as-of", "2024-01-10", "--window", "7d", "--window", "month"])
+            assert "last 7 days: 0.0%" in result.output
+            assert "this month: 30.0%" in result.output
+            
+            result = runner.invoke(cli, ["analytics", "--as-of", "2024-01-10", "--histogram", "weekday",
+                                         "--histogram", "hour", "--histogram", "week"])
+            assert "Completions by weekday:\n    Mon: 1\n    Tue: 1\n    Wed: 1" in result.output
+            assert "09:00: 3" in result.output
+            assert "2024-W01: 3" in result.output
+    
+    def test_cli_live_reports_with_future_completion(self):
+        """Test that a completion logged ahead of the clock does not break live reports."""
+        from click.testing import CliRunner
+        from src.cli import cli
+        from datetime import datetime, timedelta
+        
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            db = HabitDatabase()
+            db.save_habit(Habit("Night Shift", "daily").complete(datetime.now() + timedelta(hours=2)))
+            db.close()
+            
+            for command in (["list"], ["list", "--stream"], ["analytics", "--no-cache"],
+                            ["analytics", "--stream"]):
+                result = runner.invoke(cli, command)
+                assert "Error" not in result.output
+                assert "Night Shift" in result.output
+            assert "Streak: 1 - ✅ Active" in runner.invoke(cli, ["list"]).output
+            
+            # The SQL variant agrees and is cached under its own key
+            default = runner.invoke(cli, ["analytics"]).output
+            assert "Broken habits: 0" in default
+            assert runner.invoke(cli, ["analytics", "--sql"]).output == default
+            db = HabitDatabase()
+            keys = [row[0] for row in db.conn.execute("SELECT report_key FROM report_cache")]
+            db.close()
+            assert len([key for key in keys if key.startswith("analytics")]) == 2
+    
+    def test_cli_stream_option(self):
+        """Test the constant-memory streaming mode of list and analytics."""
+        from click.testing import CliRunner
+        from src.cli import cli
+        from datetime import datetime
+        
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            assert "No habits found" in runner.invoke(cli, ["list", "--stream"]).output
+            assert "No habits to analyze" in runner.invoke(cli, ["analytics", "--stream"]).output
+            
+            db = HabitDatabase()
+            habit = Habit("Stretch", "daily")
+            for day in range(1, 4):
+                habit.complete(datetime(2024, 1, day, 9))
+            db.save_habit(habit)
+            db.save_habit(Habit("Plan", "weekly"))
+            db.close()
+            
+            listed = runner.invoke(cli, ["list", "--stream", "--as-of", "2024-01-03 12:00:00"]).output
+            assert "Stretch (daily) - Streak: 3 - ✅ Active" in listed
+            assert "Plan (weekly) - Streak: 0 - ❌ Broken" in listed
+            
+            result = runner.invoke(cli, ["analytics", "--stream", "--as-of", "2024-01-03 12:00:00",
+                                         "--window", "7d"])
+            assert "Stretch: Current streak 3, Longest 3" in result.output
+            assert "Total habits: 2" in result.output
+            assert "Broken habits: 1" in result.output
+            assert "last 7 days:" in result.output
+            assert result.output.index("Individual Habits") < result.output.index("Summary")
+    
+    def test_cli_leaderboard(self):
+        """Test the leaderboard command, live and at a past instant."""
+        from click.testing import CliRunner
+        from src.cli import cli
+        from datetime import datetime
+        
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            assert "No habits to rank" in runner.invoke(cli, ["leaderboard"]).output
+            
+            db = HabitDatabase()
+            for name, days in (("Stretch", 3), ("Read", 1), ("Swim", 2)):
+                habit = Habit(name, "daily")
+                for day in range(1, days + 1):
+                    habit.complete(datetime(2024, 1, day, 9))
+                db.save_habit(habit)
+            db.close()
+            
+            result = runner.invoke(cli, ["leaderboard", "--top", "2"])
+            assert "Top 2 by current streak:\n  1. Stretch (daily): 3\n  2. Swim (daily): 2" in result.output
+            
+            result = runner.invoke(cli, ["leaderboard", "--top", "1", "--by", "longest",
+                                         "--as-of", "2024-01-02 12:00:00"])
+            assert "Top 1 by longest streak:" in result.output
+            assert "(daily): 2" in result.output
+    
+    def test_cli_reports_are_cached_until_data_changes(self):
+        """Test that repeated reports come from the cache and writes refresh them."""
+        from click.testing import CliRunner
+        from src.cli import cli
+        
+        runner = CliRunner()
+        with runner.isolated_filesystem():
+            runner.invoke(cli, ["create", "--name", "Walk", "--periodicity", "daily"])
+            first = runner.invoke(cli, ["analytics", "--as-of", "2024-01-10"]).output
+            
+            db = HabitDatabase()
+            key = "analytics|2024-01-10T00:00:00"
+            assert "\n".join(db.get_cached_report(key)) + "\n" == first
+            db.put_cached_report(key, ["from cache"])
+            db.close()
+            assert runner.invoke(cli, ["analytics", "--as-of", "2024-01-10"]).output == "from cache\n"
+            
+            runner.invoke(cli, ["complete", "--name", "Walk"])
+            assert runner.invoke(cli, ["analytics", "--as-of", "2024-01-10"]).output == first
+            assert "Walk (daily) - Streak: 1" in runner.invoke(cli, ["list"]).output
+    
     def test_complete_workflow(self):
         """Test complete workflow: create -> complete -> analyze."""
         # Create habits
@@ -0,0 +1,743 @@
+"""
+Unit tests for the SQLite storage layer.
+Covers persistence, incremental saves and completion writes.
+"""
+
+import asyncio
+import pytest
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from src.habit import Habit
+from src.async_storage import AsyncHabitDatabase
+from src.storage import HabitDatabase, ShardedHabitDatabase, SCHEMA_VERSION, _create_base_tables
+
+
+class TestHabitDatabase:
+    """Test cases for HabitDatabase."""
+    
+    def setup_method(self):
+        """Use an in-memory database for each test."""
+        self.db = HabitDatabase(":memory:")
+    
+    def teardown_method(self):
+        """Close the database after each test."""
+        self.db.close()
+    
+    def count_completions(self, habit_id):
+        """Count stored completion rows for a habit."""
+        cursor = self.db.conn.execute(
+            "SELECT COUNT(*) FROM completions WHERE habit_id = ?", (habit_id,)
+        )
+        return cursor.fetchone()[0]
+    
+    def test_save_appends_only_new_completions(self):
+        """Test that saving a persisted habit only inserts pending completions."""
+        habit = Habit("Exercise", "daily")
+        today = datetime.now()
+        for i in range(3):
+            habit.completions.append(today - timedelta(days=i + 1))
+        self.db.save_habit(habit)
+        assert self.count_completions(habit.id) == 3
+        
+        first_row = self.db.conn.execute(
+            "SELECT MIN(id) FROM completions WHERE habit_id = ?", (habit.id,)
+        ).fetchone()[0]
+        
+        habit.complete(today)
+        assert habit.pending_completions() == [today]
+        self.db.save_habit(habit)
+        
+        # Existing rows were not deleted and re-inserted
+        assert self.count_completions(habit.id) == 4
+        assert self.db.conn.execute(
+            "SELECT MIN(id) FROM completions WHERE habit_id = ?", (habit.id,)
+        ).fetchone()[0] == first_row
+        assert habit.pending_completions() == []
+    
+    def test_save_persists_completion_list_edits(self):
+        """Test that direct edits of a persisted habit's completions are saved."""
+        habit = Habit("Exercise", "daily")
+        today = datetime(2024, 3, 10, 8)
+        habit.complete(today - timedelta(days=2))
+        self.db.save_habit(habit)
+        
+        # Appending through the list is saved incrementally
+        habit.completions.append(today - timedelta(days=1))
+        assert habit.pending_completions() == [today - timedelta(days=1)]
+        assert not habit.is_history_dirty()
+        self.db.save_habit(habit)
+        assert self.count_completions(habit.id) == 2
+        
+        # So is extending past the latest completion; backfilling is not
+        later = [today + timedelta(hours=1), today]
+        habit.completions.extend(later)
+        assert habit.pending_completions() == sorted(later)
+        assert not habit.is_history_dirty()
+        self.db.save_habit(habit)
+        assert self.count_completions(habit.id) == 4
+        habit.completions += [today - timedelta(days=5)]
+        assert habit.is_history_dirty()
+        self.db.save_habit(habit)
+        assert self.count_completions(habit.id) == 5
+        
+        # Replacing or removing completions rewrites the stored history
+        habit.completions = [today - timedelta(days=1), today]
+        assert habit.is_history_dirty()
+        self.db.save_habit(habit)
+        assert self.db.load_all_habits()[0].completions == [today - timedelta(days=1), today]
+        assert self.summary(habit.id).total_completions == 2
+        
+        habit.completions.remove(today)
+        self.db.save_habit(habit)
+        assert self.db.load_all_habits()[0].completions == [today - timedelta(days=1)]
+        assert not habit.is_history_dirty()
+        assert habit.pending_completions() == []
+    
+    def test_metadata_dirty_tracking(self):
+        """Test that metadata changes are detected and persisted."""
+        habit = Habit("Read", "daily")
+        assert habit.is_metadata_dirty()
+        self.db.save_habit(habit)
+        assert not habit.is_metadata_dirty()
+        
+        habit.name = "Read More"
+        assert habit.is_metadata_dirty()
+        self.db.save_habit(habit)
+        
+        loaded = self.db.load_all_habits()
+        assert loaded[0].name == "Read More"
+        assert not loaded[0].is_metadata_dirty()
+        assert loaded[0].pending_completions() == []
+    
+    def test_load_compact_habits(self):
+        """Test loading habits in the memory-compact representation."""
+        habit = Habit("Exercise", "daily")
+        today = datetime.now()
+        for i in range(3):
+            habit.completions.append(today - timedelta(days=i))
+        self.db.save_habit(habit)
+        
+        compact = self.db.load_all_habits(compact=True)[0]
+        assert type(compact).__name__ == "CompactHabit"
+        assert compact.get_streak() == 3
+        
+        compact.complete(today + timedelta(days=1))
+        self.db.save_habit(compact)
+        assert self.count_completions(habit.id) == 4
+    
+    def test_add_completion(self):
+        """Test appending a single completion by habit id."""
+        habit = Habit("Meditation", "daily")
+        self.db.save_habit(habit)
+        
+        self.db.add_completion(habit.id)
+        self.db.add_completion(habit.id, datetime.now() - timedelta(days=1))
+        
+        loaded = self.db.load_all_habits()
+        assert len(loaded[0].completions) == 2
+        assert loaded[0].get_streak() == 2
+    
+    def test_load_all_habits_groups_completions(self):
+        """Test that the bulk loader assigns completions to the right habits."""
+        today = datetime.now()
+        habits = [Habit(f"Habit {i}", "daily") for i in range(4)]
+        for count, habit in enumerate(habits):
+            for day in range(count):
+                habit.completions.append(today - timedelta(days=day))
+            self.db.save_habit(habit)
+        
+        # Completions of a deleted habit are ignored
+        self.db.conn.execute(
+            "INSERT INTO completions (habit_id, completed_at) VALUES ('orphan', 0)"
+        )
+        
+        loaded = {h.id: h for h in self.db.load_all_habits()}
+        assert len(loaded) == 4
+        for count, habit in enumerate(habits):
+            completions = loaded[habit.id].completions
+            assert len(completions) == count
+            assert completions == sorted(completions)
+    
+    def test_new_database_is_at_current_schema_version(self):
+        """Test that a fresh database is fully migrated and indexed."""
+        assert self.db.schema_version() == SCHEMA_VERSION
+        indexes = {
+            row[0] for row in self.db.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index'"
+            )
+        }
+        assert "idx_completions_habit_time" in indexes
+        assert "idx_habits_user_name" in indexes
+    
+    def test_get_habit_by_name_and_id(self):
+        """Test single-habit lookups with and without completions."""
+        habit = Habit("Walk", "daily").complete()
+        self.db.save_habit(habit)
+        self.db.save_habit(Habit("Other", "weekly"))
+        
+        by_name = self.db.get_habit_by_name("Walk")
+        assert by_name.id == habit.id
+        assert len(by_name.completions) == 1
+        
+        bare = self.db.get_habit_by_id(habit.id, load_completions=False)
+        assert bare.name == "Walk"
+        assert bare.completions == []
+        
+        # Completing a bare habit only appends, history stays intact
+        bare.complete()
+        self.db.save_habit(bare)
+        assert self.count_completions(habit.id) == 2
+        
+        # Edits needing a full rewrite are refused instead of dropping stored rows
+        bare.completions.sort()
+        with pytest.raises(ValueError):
+            self.db.save_habit(bare)
+        bare = self.db.get_habit_by_name("Walk", load_completions=False)
+        bare.completions = [datetime.now()]
+        with pytest.raises(ValueError):
+            self.db.save_habit(bare)
+        assert self.count_completions(habit.id) == 2
+        
+        # Metadata edits still save without touching the history
+        bare = self.db.get_habit_by_id(habit.id, load_completions=False)
+        bare.name = "Long Walk"
+        self.db.save_habit(bare)
+        assert self.count_completions(habit.id) == 2
+        assert self.db.get_habit_by_id(habit.id).name == "Long Walk"
+        
+        assert self.db.get_habit_by_name("Long Walk").completion_count() == 2
+        assert self.db.get_habit_by_name("Missing") is None
+        assert self.db.get_habit_by_id("missing") is None
+    
+    def test_pooled_mode_rejects_memory_database(self):
+        """Test that pooled mode needs a file shared between connections."""
+        with pytest.raises(ValueError):
+            HabitDatabase(":memory:", pooled=True)
+    
+    def test_import_records_in_batches(self):
+        """Test importing completions in batches with progress reporting."""
+        existing = Habit("Run", "daily")
+        self.db.save_habit(existing)
+        
+        records = [
+            {"name": "Run", "periodicity": "daily", "completed_at": "2024-01-01T07:00:00"},
+            {"name": "Run", "periodicity": "daily", "completed_at": "2024-01-02T07:00:00"},
+            {"name": "Plan", "periodicity": "weekly", "completed_at": "2024-01-01T09:00:00"},
+            {"name": "Plan", "periodicity": "weekly", "completed_at": ""},
+            {"name": "Swim", "periodicity": "daily", "completed_at": None},
+        ]
+        reported = []
+        result = self.db.import_records(iter(records), batch_size=2, progress=reported.append)
+        
+        assert result == {"habits_created": 2, "completions_imported": 3}
+        assert reported == [2, 3]
+        assert self.count_completions(existing.id) == 2
+        assert self.db.get_habit_by_name("Plan").periodicity == "weekly"
+        assert self.db.get_habit_by_name("Swim").completions == []
+    
+    def test_import_rebuilds_backfilled_stats_once(self, monkeypatch):
+        """Test that out-of-order imports rebuild each habit's stats after the last batch."""
+        import src.storage as storage
+        rebuilt = []
+        original = storage._rebuild_stats
+        monkeypatch.setattr(storage, "_rebuild_stats",
+                            lambda cursor, habit_id: (rebuilt.append(habit_id), original(cursor, habit_id)))
+        
+        # Newest first, so every batch backfills before the stored latest
+        records = [{"name": "Run", "periodicity": "daily", "completed_at": f"2024-01-{day:02d}T07:00:00"}
+                   for day in range(20, 0, -1)]
+        self.db.import_records(records, batch_size=3)
+        
+        habit = self.db.get_habit_by_name("Run")
+        assert rebuilt == [habit.id]
+        summary = self.summary(habit.id)
+        assert (summary.current_streak, summary.longest_streak, summary.total_completions) == (20, 20, 20)
+    
+    def test_invalid_import_rolls_back(self):
+        """Test that a bad record leaves the database untouched."""
+        records = [
+            {"name": "Run", "periodicity": "daily", "completed_at": "2024-01-01T07:00:00"},
+            {"name": "Bad", "periodicity": "monthly", "completed_at": "2024-01-01T07:00:00"},
+        ]
+        with pytest.raises(ValueError):
+            self.db.import_records(records, batch_size=1)
+        assert self.db.load_all_habits() == []
+        
+        # Malformed records are reported by position
+        for bad, message in (({"completed_at": "2024-01-01T07:00:00"}, "Record 2 has no habit name"),
+                             ({"name": "Run", "completed_at": "2024-01-01T07:00:00+02:00"}, "Record 2: .*UTC offset"),
+                             ({"name": "Run", "completed_at": 1704153600.5}, "Record 2: Unsupported")):
+            with pytest.raises(ValueError, match=message):
+                self.db.import_records([records[0], bad])
+        assert self.db.load_all_habits() == []
+    
+    def test_bulk_import_csv_and_jsonl(self, tmp_path):
+        """Test reading both supported file formats."""
+        csv_path = tmp_path / "history.csv"
+        csv_path.write_text(
+            "name,periodicity,completed_at\n"
+            "Run,daily,2024-01-01T07:00:00\n"
+            "Run,daily,1704153600\n"
+        )
+        jsonl_path = tmp_path / "history.jsonl"
+        jsonl_path.write_text(
+            '{"name": "Plan", "periodicity": "weekly", "completed_at": "2024-01-01T09:00:00"}\n'
+        )
+        
+        assert self.db.bulk_import(str(csv_path))["completions_imported"] == 2
+        assert self.db.bulk_import(str(jsonl_path))["completions_imported"] == 1
+        assert self.db.get_habit_by_name("Run").completions == [
+            datetime(2024, 1, 1, 7), datetime(2024, 1, 2)
+        ]
+        
+        with pytest.raises(ValueError):
+            self.db.bulk_import(str(csv_path), file_format="xml")
+    
+    def summary(self, habit_id):
+        """Load the stored summary for one habit."""
+        return next(s for s in self.db.load_habit_summaries() if s.id == habit_id)
+    
+    def test_stats_maintained_incrementally(self):
+        """Test that habit_stats follows appends, backfills and deletes."""
+        habit = Habit("Exercise", "daily")
+        today = datetime(2024, 5, 10, 8)
+        for i in (5, 4, 3):
+            habit.completions.append(today - timedelta(days=i))
+        self.db.save_habit(habit)
+        
+        summary = self.summary(habit.id)
+        assert (summary.current_streak, summary.longest_streak, summary.total_completions) == (3, 3, 3)
+        
+        # Gap resets the current streak but keeps the longest
+        habit.complete(today)
+        self.db.save_habit(habit)
+        summary = self.summary(habit.id)
+        assert (summary.current_streak, summary.longest_streak) == (1, 3)
+        assert summary.last_completed_at == today
+        
+        self.db.add_completion(habit.id, today + timedelta(days=1))
+        assert self.summary(habit.id).current_streak == 2
+        
+        # Backfilling the gap triggers a rebuild
+        self.db.add_completion(habit.id, today - timedelta(days=2))
+        self.db.add_completion(habit.id, today - timedelta(days=1))
+        summary = self.summary(habit.id)
+        assert (summary.current_streak, summary.longest_streak, summary.total_completions) == (7, 7, 7)
+        
+        loaded = self.db.get_habit_by_id(habit.id)
+        assert loaded.get_streak() == summary.current_streak
+        
+        self.db.delete_habit(habit.id)
+        assert self.db.conn.execute("SELECT COUNT(*) FROM habit_stats").fetchone()[0] == 0
+    
+    def test_bitmaps_persisted_with_completions(self):
+        """Test that stored bitmaps answer lookups without loading history."""
+        habit = Habit("Walk", "daily")
+        start = datetime(2024, 3, 4, 8)
+        for days in (0, 1, 2):
+            habit.completions.append(start + timedelta(days=days))
+        self.db.save_habit(habit)
+        self.db.add_completion(habit.id, start + timedelta(days=9))
+        self.db.add_completion(habit.id, start - timedelta(days=7))
+        
+        days = self.db.load_bitmap(habit.id)
+        assert days.granularity == "day"
+        assert days.contains(start + timedelta(days=9))
+        assert not days.contains(start + timedelta(days=5))
+        assert days.count_between(start - timedelta(days=7), start + timedelta(days=9)) == 5
+        assert days.longest_streak() == 3
+        
+        # Only the bitmap of the habit's periodicity is stored and maintained
+        habit.periodicity = "weekly"
+        self.db.save_habit(habit)
+        weeks = self.db.load_bitmap(habit.id)
+        assert (weeks.granularity, len(weeks)) == ("week", 3)
+        assert self.db.conn.execute("SELECT COUNT(*) FROM completion_bitmaps").fetchone()[0] == 1
+        
+        self.db.delete_habit(habit.id)
+        assert self.db.load_bitmap(habit.id) is None
+    
+    def test_live_rates_from_bitmaps_match_histories(self):
+        """Test that window rates from stored bitmaps equal those from full histories."""
+        import random
+        from src.analytics import WINDOWS, bitmap_prefix, completion_rates, prefix_rates
+        
+        rng = random.Random(3)
+        as_of = datetime(2024, 6, 30, 23, 59)
+        for i in range(12):
+            habit = Habit(f"Habit {i}", rng.choice(["daily", "weekly"]))
+            habit.created_at = as_of - timedelta(days=rng.randint(0, 120))
+            for _ in range(rng.randint(0, 30)):
+                habit.complete(as_of - timedelta(days=rng.randint(0, 150), hours=rng.randint(0, 23)))
+            self.db.save_habit(habit)
+        
+        prefixes = (bitmap_prefix(*row, as_of) for row in self.db.iter_completion_bitmaps(chunk_size=5))
+        assert prefix_rates(prefixes, WINDOWS, as_of) == \
+            completion_rates(self.db.load_all_habits(), WINDOWS, as_of)
+    
+    def test_periodicity_change_rebuilds_stats(self):
+        """Test that editing periodicity recomputes the streak."""
+        habit = Habit("Review", "daily")
+        start = datetime(2024, 5, 1)
+        for i in range(3):
+            habit.completions.append(start + timedelta(weeks=i))
+        self.db.save_habit(habit)
+        assert self.summary(habit.id).current_streak == 1
+        
+        habit.periodicity = "weekly"
+        self.db.save_habit(habit)
+        assert self.summary(habit.id).current_streak == 3
+    
+    def test_user_scoping(self):
+        """Test that each user only sees and deletes their own habits."""
+        alice = self.db.for_user("alice")
+        bob = self.db.for_user("bob")
+        habit = Habit("Run", "daily").complete()
+        alice.save_habit(habit)
+        bob.save_habit(Habit("Run", "weekly"))
+        
+        assert [h.periodicity for h in alice.load_all_habits()] == ["daily"]
+        assert [h.periodicity for h in bob.load_habit_summaries()] == ["weekly"]
+        assert self.db.load_all_habits() == []
+        assert bob.get_habit_by_id(habit.id) is None
+        
+        bob.delete_habit(habit.id)
+        assert alice.get_habit_by_name("Run").completion_count() == 1
+        
+        # Writes to another user's or an unknown habit are rejected
+        intruder = Habit("Hijack", "weekly")
+        intruder.id = habit.id
+        with pytest.raises(ValueError):
+            bob.save_habit(intruder)
+        with pytest.raises(ValueError):
+            bob.add_completions([(habit.id, datetime.now())])
+        with pytest.raises(ValueError):
+            alice.add_completion("missing")
+        kept = alice.get_habit_by_id(habit.id)
+        assert (kept.name, kept.periodicity, kept.completion_count()) == ("Run", "daily", 1)
+        assert self.count_completions("missing") == 0
+    
+    def test_sql_streak_stats_match_python(self):
+        """Test that the SQL gaps-and-islands path equals the in-memory analytics."""
+        import random
+        from src.analytics import collect_habit_stats
+        
+        rng = random.Random(3)
+        as_of = datetime(2024, 6, 30, 12, 30)
+        for i in range(60):
+            habit = Habit(f"Habit {i}", rng.choice(["daily", "weekly"]))
+            for _ in range(rng.randint(0, 30)):
+                habit.complete(as_of - timedelta(days=rng.randint(-3, 40), hours=rng.randint(0, 23)))
+            self.db.save_habit(habit)
+        self.db.for_user("other").save_habit(Habit("Hidden", "daily").complete(as_of))
+        
+        habits = self.db.load_all_habits()
+        for moment in (as_of, as_of - timedelta(days=9, minutes=17)):
+            assert sorted(self.db.load_streak_stats(moment)) == sorted(collect_habit_stats(habits, moment))
+    
+    def test_iter_habits_streams_in_chunks(self):
+        """Test that streamed habits equal the bulk-loaded ones."""
+        today = datetime.now()
+        # Names and ids out of insertion order; every path keeps table order
+        for i in range(7):
+            habit = Habit(f"Habit {6 - i}", "daily")
+            habit.id = f"{(i * 3) % 7}-habit"
+            for day in range(i):
+                habit.completions.append(today - timedelta(days=day))
+            self.db.save_habit(habit)
+        self.db.for_user("other").save_habit(Habit("Hidden", "daily"))
+        
+        expected = self.db.load_all_habits()
+        assert [h.name for h in expected] == [f"Habit {6 - i}" for i in range(7)]
+        assert [s.name for s in self.db.load_habit_summaries()] == [h.name for h in expected]
+        streamed = self.db.iter_habits(chunk_size=3)
+        assert iter(streamed) is streamed
+        streamed = list(streamed)
+        assert [h.id for h in streamed] == [h.id for h in expected]
+        assert [h.completions for h in streamed] == [h.completions for h in expected]
+        assert not any(h.pending_completions() for h in streamed)
+        assert [h.completion_count() for h in self.db.iter_habits(2, compact=True)] == \
+            [h.completion_count() for h in expected]
+        assert [s.name for s in self.db.iter_habit_summaries(chunk_size=2)] == \
+            [s.name for s in self.db.load_habit_summaries()]
+    
+    def test_completion_histograms_match_python(self):
+        """Test that the SQL GROUP BY histograms equal the in-memory pass."""
+        import random
+        from src.analytics import completion_histograms
+        
+        rng = random.Random(5)
+        as_of = datetime(2024, 1, 20, 12)
+        for i in range(10):
+            habit = Habit(f"Habit {i}", "daily")
+            for _ in range(30):
+                habit.complete(as_of - timedelta(days=rng.randint(-2, 40), minutes=rng.randint(0, 1439)))
+            self.db.save_habit(habit)
+        
+        habits = self.db.load_all_habits()
+        expected = completion_histograms(habits, as_of=as_of)
+        assert self.db.completion_histograms(as_of=as_of) == expected
+        assert self.db.completion_histogram("hour", as_of) == expected["hour"]
+        assert sum(expected["hour"].values()) == sum(expected["week"].values())
+        
+        selected = completion_histograms(habits, ["weekday"], as_of, ["Habit 1", "Habit 2"])
+        assert self.db.completion_histogram("weekday", as_of, ["Habit 1", "Habit 2"]) == selected["weekday"]
+        assert "2024-W01" in expected["week"] and "2023-W52" in expected["week"]
+        
+        with pytest.raises(ValueError, match="Unknown histogram: minute"):
+            self.db.completion_histogram("minute")
+        with pytest.raises(ValueError, match="Unknown histogram: minute"):
+            completion_histograms(habits, ["minute"])
+    
+    def test_top_streaks_from_stats(self):
+        """Test the index-backed leaderboard against the in-memory one."""
+        from src.analytics import top_streaks
+        
+        today = datetime.now()
+        for i, (current, gap) in enumerate([(3, 2), (1, 6), (5, 0), (2, 1)]):
+            habit = Habit(f"Habit {i}", "daily")
+            for day in range(current):
+                habit.completions.append(today - timedelta(days=day))
+            for day in range(gap):
+                habit.completions.append(today - timedelta(days=current + 1 + day))
+            self.db.save_habit(habit)
+        self.db.for_user("other").save_habit(Habit("Hidden", "daily").complete(today))
+        
+        habits = self.db.load_all_habits()
+        for by in ("current", "longest"):
+            assert self.db.top_streaks(2, by) == top_streaks(habits, 2, by)
+        assert [e.name for e in self.db.top_streaks(10)] == ["Habit 2", "Habit 0", "Habit 3", "Habit 1"]
+        
+        # Ties keep table order, and imported habits without completions are ranked
+        self.db.save_habit(Habit("Tie", "daily").complete(today))
+        self.db.import_records([{"name": "Imported", "periodicity": "weekly", "completed_at": ""}])
+        habits = self.db.load_all_habits()
+        for by in ("current", "longest"):
+            assert self.db.top_streaks(10, by) == top_streaks(habits, 10, by)
+        assert [e.name for e in self.db.top_streaks(10)][-3:] == ["Habit 1", "Tie", "Imported"]
+        with pytest.raises(ValueError):
+            self.db.top_streaks(3, by="total")
+        
+        # The streak index drives the scan; only the tie order needs a sort
+        plan = [row[3] for row in self.db.conn.execute("""
+            EXPLAIN QUERY PLAN SELECT h.name FROM habit_stats s CROSS JOIN habits h ON h.id = s.habit_id
+            WHERE h.user_id = ? ORDER BY s.current_streak DESC, h.rowid LIMIT 3
+        """, (self.db.user_id,))]
+        assert "SCAN s USING INDEX idx_stats_current" in plan
+        assert "USE TEMP B-TREE FOR RIGHT PART OF ORDER BY" in plan
+    
+    def test_report_cache_invalidated_by_writes(self):
+        """Test that cached reports survive reads and are dropped by writes."""
+        habit = Habit("Read", "daily")
+        self.db.save_habit(habit)
+        version = self.db.data_version()
+        
+        self.db.put_cached_report("list|live", ["line"])
+        assert self.db.get_cached_report("list|live") == ["line"]
+        assert self.db.for_user("bob").get_cached_report("list|live") is None
+        
+        self.db.save_habit(habit)  # nothing changed
+        assert self.db.get_cached_report("list|live") == ["line"]
+        
+        self.db.add_completion(habit.id)
+        assert self.db.data_version() == version + 1
+        assert self.db.get_cached_report("list|live") is None
+        
+        self.db.put_cached_report("list|live", ["line"])
+        self.db.delete_habit(habit.id)
+        assert self.db.get_cached_report("list|live") is None
+    
+    def test_report_cache_evicts_least_recently_used(self):
+        """Test LRU eviction over report variants."""
+        for key in ("a", "b", "c"):
+            self.db.put_cached_report(key, key, capacity=3)
+        assert self.db.get_cached_report("a") == "a"
+        
+        self.db.put_cached_report("d", "d", capacity=3)
+        assert self.db.get_cached_report("b") is None
+        assert [self.db.get_cached_report(key) for key in "acd"] == ["a", "c", "d"]
+
+
+class TestShardedHabitDatabase:
+    """Test cases for the per-user shard router."""
+    
+    def test_users_are_routed_to_stable_shards(self, tmp_path):
+        """Test that users land on a fixed shard and stay isolated."""
+        router = ShardedHabitDatabase(str(tmp_path), shard_count=4)
+        users = [f"user{i}" for i in range(20)]
+        for user in users:
+            router.for_user(user).save_habit(Habit(f"{user} habit", "daily"))
+        
+        assert len({router.shard_index(user) for user in users}) > 1
+        for user in users:
+            assert router.shard_index(user) == router.shard_index(user)
+            habits = router.for_user(user).load_all_habits()
+            assert [h.name for h in habits] == [f"{user} habit"]
+        router.close()
+        
+        assert len(list(tmp_path.glob("habits_*.db"))) == len({router.shard_index(u) for u in users})
+        with pytest.raises(ValueError):
+            ShardedHabitDatabase(str(tmp_path), shard_count=0)
+
+
+class TestPooledDatabase:
+    """Stress tests for the WAL-backed pooled mode."""
+    
+    def test_parallel_complete_and_load(self, tmp_path):
+        """Test concurrent check-ins and full loads from several threads."""
+        db = HabitDatabase(str(tmp_path / "habits.db"), pooled=True)
+        assert db.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        names = [f"Habit {i}" for i in range(4)]
+        for name in names:
+            db.save_habit(Habit(name, "daily"))
+        
+        rounds = 25
+        errors = []
+        
+        def complete_worker(name):
+            try:
+                for _ in range(rounds):
+                    habit = db.get_habit_by_name(name, load_completions=False)
+                    habit.complete()
+                    db.save_habit(habit)
+            except Exception as e:
+                errors.append(e)
+        
+        def load_worker():
+            try:
+                for _ in range(rounds):
+                    assert len(db.load_all_habits()) == len(names)
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=complete_worker, args=(name,)) for name in names * 2]
+        threads += [threading.Thread(target=load_worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert errors == []
+        counts = {h.name: len(h.completions) for h in db.load_all_habits()}
+        assert counts == {name: rounds * 2 for name in names}
+        db.close()
+
+
+class TestAsyncHabitDatabase:
+    """Test cases for the asyncio storage interface."""
+    
+    def test_concurrent_completions_are_not_lost(self, tmp_path):
+        """Test many coroutines completing habits concurrently."""
+        async def scenario():
+            async with AsyncHabitDatabase(str(tmp_path / "habits.db")) as db:
+                habits = [Habit(f"Habit {i}", "daily") for i in range(4)]
+                await asyncio.gather(*(db.save_habit(habit) for habit in habits))
+                
+                batches = []
+                original = db._db.add_completions
+                db._db.add_completions = lambda rows: (batches.append(len(rows)), original(rows))
+                
+                start = datetime(2024, 1, 1)
+                await asyncio.gather(*(
+                    db.add_completion(habit.id, start + timedelta(days=day))
+                    for habit in habits for day in range(50)
+                ))
+                loaded = await db.load_all_habits()
+                
+                await db.delete_habit(habits[0].id)
+                remaining = await db.load_all_habits()
+                return loaded, remaining, batches
+        
+        loaded, remaining, batches = asyncio.run(scenario())
+        
+        assert sorted(len(h.completions) for h in loaded) == [50] * 4
+        assert all(h.get_streak() == 50 for h in loaded)
+        assert sum(batches) == 200
+        assert len(batches) < 200  # writes were coalesced
+        assert len(remaining) == 3
+    
+    def test_invalid_completion_only_fails_its_caller(self, tmp_path):
+        """Test that one unknown habit id does not roll back the rest of its batch."""
+        async def scenario():
+            async with AsyncHabitDatabase(str(tmp_path / "habits.db")) as db:
+                habit = Habit("Run", "daily")
+                await db.save_habit(habit)
+                start = datetime(2024, 1, 1)
+                results = await asyncio.gather(
+                    *(db.add_completion(habit.id, start + timedelta(days=day)) for day in range(5)),
+                    db.add_completion("nope", start),
+                    return_exceptions=True
+                )
+                return results, await db.load_all_habits()
+        
+        results, loaded = asyncio.run(scenario())
+        
+        assert results[:5] == [None] * 5
+        assert isinstance(results[5], ValueError)
+        assert loaded[0].completion_count() == 5
+
+
+class TestMigrations:
+    """Test cases for upgrading existing database files."""
+    
+    def test_upgrade_unversioned_database(self, tmp_path):
+        """Test that a pre-versioning habits.db is upgraded without data loss."""
+        path = str(tmp_path / "habits.db")
+        
+        # Build a database the way the original schema did
+        completed_at = datetime(2024, 3, 5, 7, 8, 9, 123456)
+        conn = sqlite3.connect(path)
+        _create_base_tables(conn.cursor())
+        conn.execute(
+            "INSERT INTO habits (id, name, periodicity, created_at) VALUES (?, ?, ?, ?)",
+            ("abc12345", "Legacy", "daily", datetime.now())
+        )
+        conn.execute(
+            "INSERT INTO completions (habit_id, completed_at) VALUES (?, ?)",
+            ("abc12345", completed_at.isoformat(" "))
+        )
+        conn.commit()
+        conn.close()
+        
+        db = HabitDatabase(path)
+        assert db.schema_version() == SCHEMA_VERSION
+        stored_type = db.conn.execute("SELECT typeof(completed_at) FROM completions").fetchone()[0]
+        habits = db.load_all_habits()
+        summaries = db.load_habit_summaries()
+        db.close()
+        
+        assert summaries[0].total_completions == 1
+        assert stored_type == "integer"
+        assert len(habits) == 1
+        assert habits[0].name == "Legacy"
+        assert habits[0].get_streak() == 1
+        assert habits[0].completions == [completed_at.replace(microsecond=0)]
+    
+    
+    def test_concurrent_first_open_migrates_once(self, tmp_path):
+        """Test that processes opening a fresh file together all succeed."""
+        import multiprocessing
+        
+        context = multiprocessing.get_context("spawn")
+        for trial in range(3):
+            path = str(tmp_path / f"race_{trial}.db")
+            with context.Pool(4) as pool:
+                versions = pool.map(_open_pooled, [path] * 4)
+            assert versions == [SCHEMA_VERSION] * 4
+            
+            db = HabitDatabase(path)
+            assert db.schema_version() == SCHEMA_VERSION
+            db.close()
+
+
+def _open_pooled(path: str) -> int:
+    """Process task: open a pooled database and report its schema version."""
+    db = HabitDatabase(path, pooled=True)
+    version = db.schema_version()
+    db.close()
+    return version
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])